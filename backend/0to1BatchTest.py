@@ -1,170 +1,17 @@
-import json, requests, time, os
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from collections import Counter
-import re
 
-# Load .env variable
-from dotenv import load_dotenv
-load_dotenv()
-AUTH_TOKEN = os.getenv("VITE_AUTH_TOKEN")
+from batch_eval import run_task
+from eval_tasks import TASKS
 
-# Validate required files and environment
-required_files = ['prompt_2.js', 'sentences.json']
-for file in required_files:
-    if not os.path.exists(file):
-        raise FileNotFoundError(f"Required file '{file}' not found")
-
-if not AUTH_TOKEN:
-    raise ValueError("VITE_AUTH_TOKEN not found in environment variables")
-
-# Load prompt and data
-with open('prompt_2.js', 'r', encoding='utf-8') as pf:
-    prompt = pf.read().strip()
-
-with open("sentences.json", "r", encoding='utf-8') as f:
-    data = json.load(f)
-
-# Configuration
-API_URL = "http://127.0.0.1:8010/invoke"
-MODEL = "gpt-4.1"
-DEV_PROMPT = prompt
-OUTPUT_FILE = "4.1_0to1_results.csv"
-
-# Function to extract emotion and score from output format
-def extract_emotion_and_score(prediction_text):
-    """
-    Extract emotion label and score from format: 情緒：<情緒標籤> 程度：<分數>
-    Returns tuple: (emotion_label, score) or (None, None) if parsing fails
-    """
-    if not isinstance(prediction_text, str):
-        return None, None
-    
-    # Pattern to match 情緒：<emotion> 程度：<score>
-    pattern = r'情緒：([^程度\s]+)\s*程度：([0-9.]+)'
-    match = re.search(pattern, prediction_text)
-    
-    if match:
-        emotion = match.group(1).strip()
-        try:
-            score = float(match.group(2))
-            return emotion, score
-        except ValueError:
-            return emotion, None
-    
-    return None, None
-
-# Initialize tracking variables
-results = []
-times = []
-error_count = 0
-total_requests = 0
-emotion_scores = []  # Store all emotion scores for histogram
-
-# Calculate total requests for progress tracking
-total_requests_count = sum(len(sent["emotion_sentences"]) for char in data for sent in char["sentences"])
-current_request = 0
-
-print(f"Starting batch processing of {total_requests_count} requests...")
-print("=" * 60)
-
-for character in data:
-    character_info = character["character_information"]
-    
-    for emo in character["sentences"]:
-        label = emo["emotion_label"]
-        print(f"\n[Character: {character_info}] [Emotion: {label}]")
-        
-        for i, sent in enumerate(emo["emotion_sentences"]):
-            current_request += 1
-            progress = (current_request / total_requests_count) * 100
-            
-            payload = {
-                "instance_id": "111",
-                "developer_prompt": DEV_PROMPT,
-                "user_prompt": sent,
-                "model_name": MODEL,
-                "temperature": 0.6
-            }
-            
-            headers = {
-                "Content-Type": "application/json",
-                "X-Function-Name": "batch-test2",
-                "X-Platform-ID": "456",
-                "Authorization": f"Bearer {AUTH_TOKEN}"
-            }
-
-            try:
-                start = time.time()
-                response = requests.post(API_URL, headers=headers, json=payload, timeout=30)
-                elapsed = time.time() - start
-                times.append(elapsed)
-                
-                if response.status_code == 200:
-                    res_json = response.json()
-                    pred_raw = res_json.get("response", "ERROR")
-                    
-                    # Extract emotion and score from the response
-                    pred_emotion, pred_score = extract_emotion_and_score(pred_raw)
-                    
-                    if pred_emotion is not None:
-                        pred = pred_emotion
-                        if pred_score is not None:
-                            emotion_scores.append(pred_score)
-                    else:
-                        pred = "PARSE_ERROR"
-                        error_count += 1
-                else:
-                    pred_raw = f"HTTP_ERROR_{response.status_code}"
-                    pred = pred_raw
-                    pred_score = None
-                    error_count += 1
-                    
-            except requests.exceptions.Timeout:
-                pred_raw = "TIMEOUT_ERROR"
-                pred = pred_raw
-                pred_score = None
-                elapsed = 30.0  # timeout duration
-                times.append(elapsed)
-                error_count += 1
-            except Exception as e:
-                pred_raw = f"ERROR: {str(e)}"
-                pred = pred_raw
-                pred_score = None
-                elapsed = 0
-                times.append(elapsed)
-                error_count += 1
-
-            # Print progress and results
-            print(f" [{current_request}/{total_requests_count}] ({progress:.1f}%) "
-                  f"Time: {elapsed:.3f}s")
-            print(f" Input: {sent[:80]}{'...' if len(sent) > 80 else ''}")
-            print(f" Raw Response: {pred_raw if 'pred_raw' in locals() else pred}")
-            
-            if 'response' in locals():
-                status = response.status_code
-            else:
-                status = 'N/A'
-            print(f"  Status: {status}")
-
-            results.append({
-                "character": character_info,
-                "true_emotion": label,
-                "sentence": sent,
-                "raw_response": pred_raw if 'pred_raw' in locals() else pred,
-                "predicted_emotion": pred,
-                "predicted_score": pred_score if 'pred_score' in locals() else None,
-                "time": elapsed,
-                "status": status
-            })
-            
-            # Rate limiting
-            time.sleep(1)
-
-print("\n" + "=" * 60)
-print("PROCESSING COMPLETE")
-print("=" * 60)
+# Emotion + 0-1 score (程度) per sentence; prompt in llm-proxy/prompts/emotion-score,
+# parser eval_tasks.parse_score. Results are saved to 4.1_0to1_results.csv by run_task.
+df = run_task(TASKS["score"])
+results = df.to_dict("records")
+times = df["api_time"].tolist()
+error_count = int(df["predicted_emotion"].astype(str).str.contains("ERROR").sum())
+emotion_scores = df["predicted_score"].dropna().tolist()  # Store all emotion scores for histogram
 
 # Performance Statistics
 if times:
@@ -185,11 +32,6 @@ if times:
     print(f"95th Percentile: {times_series.quantile(0.95):.3f}s")
     print(f"99th Percentile: {times_series.quantile(0.99):.3f}s")
 
-# Save results to CSV
-df = pd.DataFrame(results)
-df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8')
-print(f"\nResults saved to: {OUTPUT_FILE}")
-
 # Accuracy Analysis - now using extracted emotions
 print(f"\n=== Accuracy Analysis ===")
 valid_predictions = df[~df["predicted_emotion"].astype(str).str.contains("ERROR|TIMEOUT|PARSE_ERROR", na=False)]
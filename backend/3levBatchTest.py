@@ -1,226 +1,19 @@
-import json, requests, time, os
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 from collections import Counter
-import re
 
-# Load .env variable
-from dotenv import load_dotenv
-load_dotenv()
-AUTH_TOKEN = os.getenv("VITE_AUTH_TOKEN")
+from batch_eval import run_task
+from eval_tasks import TASKS
 
-# Validate required files and environment
-required_files = ['sentences.json']
-for file in required_files:
-    if not os.path.exists(file):
-        print(f"Warning: Required file '{file}' not found")
-
-if not AUTH_TOKEN:
-    raise ValueError("VITE_AUTH_TOKEN not found in environment variables")
-
-# Combined prompt for both emotion classification and intensity measurement
-def load_prompt(filename, default_content=""):
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        return default_content
-
-COMBINED_PROMPT_DEFAULT = """
-你是一個中文語言分析系統，請對使用者輸入的句子同時進行情緒分類和語言強度分類。
-
-任務1：情緒分類  
-請判斷此句最符合下列哪一種情緒（只能選一個）：憤怒、期待、厭惡、恐懼、喜悅、悲傷、驚奇、信任。
-
-任務2：語言強度分類  
-請根據句子的語言表達強度，將其分類為以下三個等級之一：
-
-- Low：語言平和、溫和，情感表達較為含蓄
-- Medium：語言有一定力度，情感表達適中
-- High：語言激烈、強烈，情感表達非常突出
-
-考慮因素包括：
-- 形容詞和副詞的使用
-- 程度副詞（如「很」、「非常」、「極為」等）
-- 語氣詞和感嘆詞
-- 重複和強調用法
-- 整體語調和情感色彩
-
-輸出格式：
-情緒：<情緒標籤>
-強度：<Low/Medium/High>
-
-請勿補充說明，直接輸出結果。
-"""
-
-combined_prompt = load_prompt('combined_emotion_intensity_prompt.txt', COMBINED_PROMPT_DEFAULT)
-
-# Load test data
-with open("sentences.json", "r", encoding='utf-8') as f:
-    data = json.load(f)
-
-# Configuration
-API_URL = "http://127.0.0.1:8010/invoke"
-MODEL = "gpt-4.1"
-OUTPUT_FILE = "4.1_3lev_results.csv"
-
-def make_api_call(prompt, user_input, function_name, temperature=0.6):
-    """Make a single API call and return the result"""
-    payload = {
-        "instance_id": "111",
-        "developer_prompt": prompt,
-        "user_prompt": user_input,
-        "model_name": MODEL,
-        "temperature": temperature
-    }
-    
-    headers = {
-        "Content-Type": "application/json",
-        "X-Function-Name": function_name,
-        "X-Platform-ID": "456",
-        "Authorization": f"Bearer {AUTH_TOKEN}"
-    }
-    
-    try:
-        start = time.time()
-        response = requests.post(API_URL, headers=headers, json=payload, timeout=30)
-        elapsed = time.time() - start
-        
-        if response.status_code == 200:
-            res_json = response.json()
-            result = res_json.get("response", "ERROR").strip()
-        else:
-            result = f"HTTP_ERROR_{response.status_code}"
-            
-        return result, elapsed, response.status_code
-        
-    except requests.exceptions.Timeout:
-        return "TIMEOUT_ERROR", 30.0, "TIMEOUT"
-    except Exception as e:
-        return f"ERROR: {str(e)}", 0, "ERROR"
-
-def parse_combined_response(response):
-    """Extract both emotion and intensity from combined response"""
-    result = {
-        "emotion": "PARSE_ERROR",
-        "intensity": "PARSE_ERROR"
-    }
-    
-    if "ERROR" in str(response):
-        result["emotion"] = "ERROR"
-        result["intensity"] = "ERROR"
-        return result
-    
-    # Parse emotion
-    emotion_match = re.search(r'情緒[：:]\s*([^：:\n\r]+)', response)
-    if emotion_match:
-        result["emotion"] = emotion_match.group(1).strip()
-    else:
-        # Fallback: look for known emotions
-        emotions = ['憤怒', '期待', '厭惡', '恐懼', '喜悅', '悲傷', '驚奇', '信任']
-        for emotion in emotions:
-            if emotion in response:
-                result["emotion"] = emotion
-                break
-    
-    # Parse intensity
-    intensity_match = re.search(r'強度[：:]\s*([^：:\n\r]+)', response)
-    if intensity_match:
-        intensity = intensity_match.group(1).strip()
-        # Normalize to standard format
-        if intensity.lower() in ['low', '低', '低強度']:
-            result["intensity"] = "Low"
-        elif intensity.lower() in ['medium', '中', '中強度']:
-            result["intensity"] = "Medium"
-        elif intensity.lower() in ['high', '高', '高強度']:
-            result["intensity"] = "High"
-        else:
-            result["intensity"] = intensity
-    else:
-        # Fallback: look for known intensity levels
-        if "Low" in response or "低" in response:
-            result["intensity"] = "Low"
-        elif "Medium" in response or "中" in response:
-            result["intensity"] = "Medium"
-        elif "High" in response or "高" in response:
-            result["intensity"] = "High"
-    
-    return result
-
-# Initialize tracking variables
-results = []
-api_times = []
-intensity_levels = []  # Store all intensity classifications
-emotion_error_count = 0
-intensity_error_count = 0
-
-# Calculate total requests for progress tracking
-total_requests_count = sum(len(sent["emotion_sentences"]) for char in data for sent in char["sentences"])
-current_request = 0
-
-print(f"Starting combined single API batch processing of {total_requests_count} sentences...")
-print("Each sentence will make 1 API call for both: Emotion Classification + Intensity Classification")
-print("=" * 80)
-
-for character in data:
-    character_info = character["character_information"]
-    
-    for emo in character["sentences"]:
-        label = emo["emotion_label"]
-        print(f"\n[Character: {character_info}] [True Emotion: {label}]")
-        
-        for i, sent in enumerate(emo["emotion_sentences"]):
-            current_request += 1
-            progress = (current_request / total_requests_count) * 100
-            
-            print(f"  [{current_request}/{total_requests_count}] ({progress:.1f}%)")
-            print(f"  Input: {sent[:80]}{'...' if len(sent) > 80 else ''}")
-            
-            # Single Combined API Call
-            combined_result, api_time, api_status = make_api_call(
-                combined_prompt, sent, "emotion-intensity-analyze", temperature=0.6
-            )
-            api_times.append(api_time)
-            parsed_result = parse_combined_response(combined_result)
-            
-            # Track errors
-            if "ERROR" in parsed_result["emotion"] or "PARSE_ERROR" in parsed_result["emotion"]:
-                emotion_error_count += 1
-            
-            if parsed_result["intensity"] in ["Low", "Medium", "High"]:
-                intensity_levels.append(parsed_result["intensity"])
-            else:
-                intensity_error_count += 1
-            
-            print(f"  API Call: {api_time:.3f}s | Status: {api_status}")
-            print(f"  Emotion: {parsed_result['emotion']} | Intensity: {parsed_result['intensity']}")
-            
-            # Store results
-            result_row = {
-                "character": character_info,
-                "true_emotion": label,
-                "sentence": sent,
-                "predicted_emotion": parsed_result["emotion"],
-                "intensity_level": parsed_result["intensity"],
-                "raw_response": combined_result,
-                "api_time": api_time,
-                "api_status": api_status
-            }
-            
-            results.append(result_row)
-            
-            # Rate limiting
-            time.sleep(1)
-
-print("\n" + "=" * 80)
-print("COMBINED SINGLE API PROCESSING COMPLETE")
-print("=" * 80)
-
-# Save results to CSV
-df = pd.DataFrame(results)
-df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8')
-print(f"\nResults saved to: {OUTPUT_FILE}")
+# Emotion classification + Low/Medium/High intensity in one call per sentence; prompt in
+# llm-proxy/prompts/emotion-intensity, parser eval_tasks.parse_intensity.
+df = run_task(TASKS["intensity"])
+results = df.to_dict("records")
+api_times = df["api_time"].tolist()
+intensity_levels = [level for level in df["intensity_level"] if level in ["Low", "Medium", "High"]]
+emotion_error_count = int(df["predicted_emotion"].astype(str).str.contains("ERROR").sum())
+intensity_error_count = len(df) - len(intensity_levels)
 
 # Performance Statistics
 total_time = sum(df['api_time'])
@@ -228,7 +21,7 @@ total_time = sum(df['api_time'])
 print(f"\n=== Performance Summary ===")
 print(f"Total Sentences Processed: {len(results)}")
 print(f"Total API Calls Made: {len(results)} (50% reduction from dual API approach)")
-print(f"Total Processing Time: {total_time:.1f}s ({total_time/60:.1f} minutes)")
+print(f"Total API Time (summed over concurrent calls): {total_time:.1f}s ({total_time/60:.1f} minutes)")
 
 print(f"\n--- Combined API Performance ---")
 api_series = pd.Series(api_times)
@@ -1,235 +1,18 @@
-import json, requests, time, os
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from collections import Counter
-import re
 
-# Load .env variable
-from dotenv import load_dotenv
-load_dotenv()
-AUTH_TOKEN = os.getenv("VITE_AUTH_TOKEN")
+from batch_eval import run_task
+from eval_tasks import TASKS
 
-# Validate required files and environment
-required_files = ['sentences.json']
-for file in required_files:
-    if not os.path.exists(file):
-        print(f"File '{file}' not found")
-
-if not AUTH_TOKEN:
-    raise ValueError("VITE_AUTH_TOKEN not found")
-
-def load_prompt(filename, default_content=""):
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        return default_content
-
-COMBINED_PROMPT_DEFAULT = """
-你是一個中文語言分析系統，請對使用者輸入的句子同時進行情緒分類和 tension 計算。
-
-任務1：情緒分類  
-請判斷此句最符合下列哪一種情緒（只能選一個）：憤怒、期待、厭惡、恐懼、喜悅、悲傷、驚奇、信任。
-
-任務2：Tension 計算  
-請根據以下公式與定義計算此句的 Tension 值：
-
-Tension = ( Modifier + Idiom + 2 × DegreeHead ) ÷ WordCount
-
-定義如下：
-- MODIFIER：形容詞、副詞的數量（語氣強化）
-- IDIOM：成語或諺語數量
-- DegreeHead：程度副詞（例如「很」、「非常」、「極為」、「好」、「太」、「最」）的數量
-- WordCount：句子的詞彙總數（不含標點符號）
-
-輸出格式：
-情緒：<情緒標籤>
-Modifier：<數值>
-Idiom：<數值>
-DegreeHead：<數值>
-WordCount：<數值>  
-Tension：<結果數值，小數點後兩位>
-
-請勿補充說明，直接輸出結果。
-"""
-
-combined_prompt = load_prompt('combined_prompt.txt', COMBINED_PROMPT_DEFAULT)
-
-# Load test data
-with open("sentences.json", "r", encoding='utf-8') as f:
-    data = json.load(f)
-
-# Configuration
-API_URL = "http://127.0.0.1:8010/invoke"
-MODEL = "gpt-4.1"
-OUTPUT_FILE = "4.1_tension_results.csv"
-
-def make_api_call(prompt, user_input, function_name, temperature=0.6):
-    """Make a single API call and return the result"""
-    payload = {
-        "instance_id": "222",
-        "developer_prompt": prompt,
-        "user_prompt": user_input,
-        "model_name": MODEL,
-        "temperature": temperature
-    }
-    
-    headers = {
-        "Content-Type": "application/json",
-        "X-Function-Name": function_name,
-        "X-Platform-ID": "222",
-        "Authorization": f"Bearer {AUTH_TOKEN}"
-    }
-    
-    try:
-        start = time.time()
-        response = requests.post(API_URL, headers=headers, json=payload, timeout=30)
-        elapsed = time.time() - start
-        
-        if response.status_code == 200:
-            res_json = response.json()
-            result = res_json.get("response", "ERROR").strip()
-        else:
-            result = f"HTTP_ERROR_{response.status_code}"
-            
-        return result, elapsed, response.status_code
-        
-    except requests.exceptions.Timeout:
-        return "TIMEOUT_ERROR", 30.0, "TIMEOUT"
-    except Exception as e:
-        return f"ERROR: {str(e)}", 0, "ERROR"
-
-def parse_combined_response(response):
-    """Extract both emotion and tension metrics from combined response"""
-    result = {
-        "emotion": "PARSE_ERROR",
-        "modifier": "ERROR",
-        "idiom": "ERROR",
-        "degree_head": "ERROR",
-        "word_count": "ERROR",
-        "tension": "ERROR"
-    }
-    
-    if "ERROR" in str(response):
-        return result
-    
-    # Parse emotion
-    emotion_match = re.search(r'情緒[：:]\s*([^：:\n\r]+)', response)
-    if emotion_match:
-        result["emotion"] = emotion_match.group(1).strip()
-    else:
-        # Fallback: look for known emotions
-        emotions = ['憤怒', '期待', '厭惡', '恐懼', '喜悅', '悲傷', '驚奇', '信任']
-        for emotion in emotions:
-            if emotion in response:
-                result["emotion"] = emotion
-                break
-    
-    # Parse tension components
-    patterns = {
-        'modifier': r'Modifier[：:]\s*(\d+)',
-        'idiom': r'Idiom[：:]\s*(\d+)', 
-        'degree_head': r'DegreeHead[：:]\s*(\d+)',
-        'word_count': r'WordCount[：:]\s*(\d+)',
-        'tension': r'Tension[：:]\s*([\d.]+)'
-    }
-    
-    for key, pattern in patterns.items():
-        match = re.search(pattern, response)
-        if match:
-            if key == 'tension':
-                try:
-                    result[key] = float(match.group(1))
-                except ValueError:
-                    result[key] = "PARSE_ERROR"
-            else:
-                try:
-                    result[key] = int(match.group(1))
-                except ValueError:
-                    result[key] = "PARSE_ERROR"
-        else:
-            result[key] = "PARSE_ERROR"
-    
-    return result
-
-# Initialize tracking variables
-results = []
-api_times = []
-tension_scores = []  # Store all tension scores for histogram
-emotion_error_count = 0
-tension_error_count = 0
-
-# Calculate total requests for progress tracking
-total_requests_count = sum(len(sent["emotion_sentences"]) for char in data for sent in char["sentences"])
-current_request = 0
-
-print(f"Starting combined single API batch processing of {total_requests_count} sentences...")
-print("Each sentence will make 1 API call for both: Emotion Classification + Tension Measurement")
-print("=" * 80)
-
-for character in data:
-    character_info = character["character_information"]
-    
-    for emo in character["sentences"]:
-        label = emo["emotion_label"]
-        print(f"\n[Character: {character_info}] [True Emotion: {label}]")
-        
-        for i, sent in enumerate(emo["emotion_sentences"]):
-            current_request += 1
-            progress = (current_request / total_requests_count) * 100
-            
-            print(f"  [{current_request}/{total_requests_count}] ({progress:.1f}%)")
-            print(f"  Input: {sent[:80]}{'...' if len(sent) > 80 else ''}")
-            
-            # Single Combined API Call
-            combined_result, api_time, api_status = make_api_call(
-                combined_prompt, sent, "emotion-tension-analyze", temperature=0.6
-            )
-            api_times.append(api_time)
-            parsed_result = parse_combined_response(combined_result)
-            
-            # Track errors
-            if "ERROR" in parsed_result["emotion"] or "PARSE_ERROR" in parsed_result["emotion"]:
-                emotion_error_count += 1
-            
-            if isinstance(parsed_result.get('tension'), (int, float)):
-                tension_scores.append(parsed_result['tension'])
-            else:
-                tension_error_count += 1
-            
-            print(f"  API Call: {api_time:.3f}s | Status: {api_status}")
-            print(f"  Emotion: {parsed_result['emotion']} | Tension: {parsed_result.get('tension', 'ERROR')}")
-            
-            # Store results
-            result_row = {
-                "character": character_info,
-                "true_emotion": label,
-                "sentence": sent,
-                "predicted_emotion": parsed_result["emotion"],
-                "tension_modifier": parsed_result.get('modifier', 'ERROR'),
-                "tension_idiom": parsed_result.get('idiom', 'ERROR'), 
-                "tension_degree_head": parsed_result.get('degree_head', 'ERROR'),
-                "tension_word_count": parsed_result.get('word_count', 'ERROR'),
-                "tension_score": parsed_result.get('tension', 'ERROR'),
-                "raw_response": combined_result,
-                "api_time": api_time,
-                "api_status": api_status
-            }
-            
-            results.append(result_row)
-            
-            # Rate limiting
-            time.sleep(1)
-
-print("\n" + "=" * 80)
-print("COMBINED SINGLE API PROCESSING COMPLETE")
-print("=" * 80)
-
-# Save results to CSV
-df = pd.DataFrame(results)
-df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8')
-print(f"\nResults saved to: {OUTPUT_FILE}")
+# Emotion classification + tension components in one call per sentence; prompt in
+# llm-proxy/prompts/emotion-tension, parser eval_tasks.parse_tension.
+df = run_task(TASKS["tension"])
+results = df.to_dict("records")
+api_times = df["api_time"].tolist()
+tension_scores = pd.to_numeric(df["tension_score"], errors="coerce").dropna().tolist()  # Store all tension scores for histogram
+emotion_error_count = int(df["predicted_emotion"].astype(str).str.contains("ERROR").sum())
+tension_error_count = len(df) - len(tension_scores)
 
 # Performance Statistics
 total_time = sum(df['api_time'])
@@ -237,7 +20,7 @@ total_time = sum(df['api_time'])
 print(f"\n=== Performance Summary ===")
 print(f"Total Sentences Processed: {len(results)}")
 print(f"Total API Calls Made: {len(results)} (50% reduction from dual API approach)")
-print(f"Total Processing Time: {total_time:.1f}s ({total_time/60:.1f} minutes)")
+print(f"Total API Time (summed over concurrent calls): {total_time:.1f}s ({total_time/60:.1f} minutes)")
 
 print(f"\n--- Combined API Performance ---")
 api_series = pd.Series(api_times)
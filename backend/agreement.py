@@ -0,0 +1,128 @@
+"""How well the single-call "all" task agrees with the three separate runs.
+
+    python batch_eval.py all          # one call per sentence -> 4.1_1call_results.csv
+    python agreement.py               # vs 4.1_tension / 0to1 / 3lev results
+
+Everything is joined on sentence_id; the report gives, per dimension, the
+agreement rate (emotion, intensity level, tension components) or the mean
+absolute difference and correlation (0-1 score, tension) over the sentences
+both sides answered, plus gold-emotion accuracy of each run. The joined
+table is written next to it for a closer look.
+"""
+import argparse
+import json
+
+import pandas as pd
+
+from merge_results import join_on_sentence
+
+SINGLE = {
+    "predicted_emotion": "emotion",
+    "predicted_score": "score",
+    "intensity_level": "intensity",
+    "tension_modifier": "modifier",
+    "tension_idiom": "idiom",
+    "tension_degree_head": "degree_head",
+    "tension_word_count": "word_count",
+    "tension_score": "tension",
+}
+SEPARATE = {
+    "tension": {
+        "predicted_emotion": "emotion_tension_run",
+        "tension_modifier": "modifier_sep",
+        "tension_idiom": "idiom_sep",
+        "tension_degree_head": "degree_head_sep",
+        "tension_word_count": "word_count_sep",
+        "tension_score": "tension_sep",
+    },
+    "score": {"predicted_emotion": "emotion_score_run", "predicted_score": "score_sep"},
+    "intensity": {"predicted_emotion": "emotion_intensity_run", "intensity_level": "intensity_sep"},
+}
+INTENSITY_LEVELS = ("Low", "Medium", "High")
+
+
+def _valid_label(series):
+    # ERROR / PARSE_ERROR / HTTP_ERROR_500 etc. are failed calls, not answers
+    return series.notna() & ~series.astype(str).str.contains("ERROR")
+
+
+def _agreement(a, b):
+    both = _valid_label(a) & _valid_label(b)
+    n = int(both.sum())
+    rate = float((a[both].astype(str) == b[both].astype(str)).mean()) if n else None
+    return {"n": n, "agreement": rate}
+
+
+def _numeric_agreement(a, b):
+    a, b = pd.to_numeric(a, errors="coerce"), pd.to_numeric(b, errors="coerce")
+    both = a.notna() & b.notna()
+    n = int(both.sum())
+    if not n:
+        return {"n": 0, "mae": None, "pearson": None}
+    pearson = a[both].corr(b[both]) if n > 1 else None
+    return {
+        "n": n,
+        "mae": float((a[both] - b[both]).abs().mean()),
+        "pearson": None if pearson is None or pd.isna(pearson) else float(pearson),
+    }
+
+
+def _accuracy(predicted, gold):
+    answered = _valid_label(predicted) & gold.notna()
+    n = int(answered.sum())
+    return {"n": n, "accuracy": float((predicted[answered] == gold[answered]).mean()) if n else None}
+
+
+def agreement_report(df):
+    """Agreement of the single-call columns with the *_sep / emotion_*_run columns of a joined table."""
+    intensity = df["intensity"].where(df["intensity"].isin(INTENSITY_LEVELS))
+    intensity_sep = df["intensity_sep"].where(df["intensity_sep"].isin(INTENSITY_LEVELS))
+    return {
+        "sentences": len(df),
+        "api_calls": {"single_call": int(df["emotion"].notna().sum()), "separate": int(sum(
+            df[f"emotion_{run}_run"].notna().sum() for run in SEPARATE))},
+        "emotion": {f"vs_{run}_run": _agreement(df["emotion"], df[f"emotion_{run}_run"]) for run in SEPARATE},
+        "emotion_accuracy": {
+            "single_call": _accuracy(df["emotion"], df["true_emotion"]),
+            **{f"{run}_run": _accuracy(df[f"emotion_{run}_run"], df["true_emotion"]) for run in SEPARATE},
+        },
+        "score": _numeric_agreement(df["score"], df["score_sep"]),
+        "intensity": {
+            **_agreement(intensity, intensity_sep),
+            "confusion": pd.crosstab(intensity, intensity_sep).to_dict(),  # {separate: {single: count}}
+        },
+        "tension": _numeric_agreement(df["tension"], df["tension_sep"]),
+        "tension_components": {
+            column: _agreement(df[column], df[f"{column}_sep"])
+            for column in ("modifier", "idiom", "degree_head", "word_count")
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the single-call results with the separate runs")
+    parser.add_argument("--single", default="4.1_1call_results.csv")
+    parser.add_argument("--tension", default="4.1_tension_results.csv")
+    parser.add_argument("--score", default="4.1_0to1_results.csv")
+    parser.add_argument("--intensity", default="4.1_3lev_results.csv")
+    parser.add_argument("--output", default="gpt_1call_agreement.csv", help="joined side-by-side table")
+    args = parser.parse_args()
+
+    df = join_on_sentence([
+        (args.single, SINGLE),
+        (args.tension, SEPARATE["tension"]),
+        (args.score, SEPARATE["score"]),
+        (args.intensity, SEPARATE["intensity"]),
+    ])
+    df.to_csv(args.output, index=False, encoding="utf-8-sig")
+
+    report = agreement_report(df)
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    emotion = ", ".join(f"{run} {result['agreement']:.1%}" for run, result in report["emotion"].items()
+                        if result["agreement"] is not None)
+    print(f"✅ {report['sentences']} sentences, {report['api_calls']['single_call']} calls instead of "
+          f"{report['api_calls']['separate']}; emotion agreement {emotion}; joined table in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""Async batch evaluation of LLM prompts over a sentence corpus.
+
+The experiment scripts (0to1BatchTest.py, 3levBatchTest.py, ...) used to
+each run their own serial requests.post loop over sentences.json. Here an
+experiment is a Task (prompt, parser, output columns, models) defined in
+eval_tasks.py, and this engine keeps up to `concurrency` requests in flight
+through llm-proxy, which already paces, retries and caches the upstream
+calls. Prompts are sent as prompt_id/prompt_version and expanded by the
+proxy's prompt registry.
+
+Every finished row is appended to a JSONL journal next to the output CSV
+as soon as it arrives. Rerunning the same command after a crash, token
+expiry or Ctrl-C skips the (sentence, prompt, model) rows already answered
+and only calls the API for the rest; failed calls are retried.
+
+The corpus is read lazily (corpus.read_corpus) and results are streamed
+from the journal into the CSV, so memory does not grow with the corpus
+beyond the set of finished keys. CSV rows are in completion order; join
+on sentence_id rather than row position.
+
+A big run can be split across processes or machines with --shard i/N
+(by a stable hash of the sentence); each shard writes its own CSV and
+journal, and merge_results.py joins them back together.
+
+Across runs, successful answers also go into the content-addressed
+result store (result_store.py), keyed by sentence text, prompt text,
+model and temperature. Any run looks there first, so re-scoring the same
+sentences with an unchanged prompt costs no API calls, and a prompt
+experiment only pays for the sentences/models it has not seen yet.
+--no-store bypasses it.
+
+    python batch_eval.py tension --concurrency 16
+    python batch_eval.py tension --shard 2/4
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+import httpx
+import pandas as pd
+from dotenv import load_dotenv
+
+from corpus import parse_shard, read_corpus, shard
+from prompt_files import resolve_prompt
+from result_store import ResultStore, result_key, text_hash
+
+load_dotenv()
+AUTH_TOKEN = os.getenv("VITE_AUTH_TOKEN")
+
+API_URL = os.getenv("BATCH_EVAL_API_URL", "http://127.0.0.1:8010/invoke")
+CONCURRENCY = int(os.getenv("BATCH_EVAL_CONCURRENCY", "16"))
+REQUEST_TIMEOUT = float(os.getenv("BATCH_EVAL_TIMEOUT", "30"))
+
+
+class Task:
+    """One experiment: the prompt and models to run and how to turn a raw answer into output columns.
+
+    parse(raw_response) returns a dict with exactly `columns` as keys (checked
+    for every row); it is also given the "HTTP_ERROR_..."/"TIMEOUT_ERROR"/
+    "ERROR: ..." markers of failed calls and should map them to error values.
+    """
+
+    def __init__(self, name, prompt_id, parse, columns, output, models=("gpt-4.1",), prompt_version=None,
+                 temperature=0.6, instance_id="111", function_name="batch-test", platform_id="456",
+                 corpus="sentences.json"):
+        self.name = name
+        self.prompt_id = prompt_id
+        self.prompt_version = prompt_version  # None = latest at the start of the run
+        self.parse = parse
+        self.columns = list(columns)
+        self.output = output
+        self.models = list(models)
+        self.temperature = temperature
+        self.instance_id = instance_id
+        self.function_name = function_name
+        self.platform_id = platform_id
+        self.corpus = corpus
+
+
+class Journal:
+    """Append-only JSONL of finished rows, keyed by (sentence_id, prompt_id, prompt_version, model).
+
+    Only the keys of successful rows are kept in memory; the rows stay on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done_keys = set()
+        if os.path.exists(path):
+            self._load()
+        self._file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def key(row):
+        return row["sentence_id"], row["prompt_id"], str(row["prompt_version"]), row["model"]
+
+    def _lines(self):
+        """(byte offset, parsed row) of every intact line; a torn last line of a killed run is skipped."""
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    row = None
+                yield offset, row
+                offset += len(line)
+
+    def _load(self):
+        for _, row in self._lines():
+            if row is not None and row["api_status"] == 200:
+                self.done_keys.add(self.key(row))
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+        if torn:  # start the next row on a fresh line
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n")
+
+    def done(self, key):
+        """Whether key already has a successful answer (failed calls are retried)."""
+        return key in self.done_keys
+
+    def append(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        if row["api_status"] == 200:
+            self.done_keys.add(self.key(row))
+
+    def close(self):
+        self._file.close()
+
+    def rows(self):
+        """The latest row of every key, in journal order, read back from disk."""
+        latest = {}
+        for offset, row in self._lines():
+            if row is not None:
+                latest[self.key(row)] = offset
+        keep = set(latest.values())
+        for offset, row in self._lines():
+            if offset in keep:
+                yield row
+
+
+async def evaluate(client, task, prompt_version, record, model):
+    """Score one sentence with one model; failures become error markers, never exceptions."""
+    payload = {
+        "instance_id": task.instance_id,
+        "prompt_id": task.prompt_id,
+        "prompt_version": prompt_version,
+        "user_prompt": record["sentence"],
+        "model_name": model,
+        "temperature": task.temperature,
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "X-Function-Name": task.function_name,
+        "X-Platform-ID": task.platform_id,
+        "Authorization": f"Bearer {AUTH_TOKEN}",
+    }
+
+    start = time.perf_counter()
+    try:
+        response = await client.post(API_URL, headers=headers, json=payload)
+        elapsed = time.perf_counter() - start
+        status = response.status_code
+        if status == 200:
+            res_json = response.json()
+            if "error" in res_json:  # llm-proxy reports upstream failures in a 200 body
+                raw, status = f"ERROR: {res_json['error']}", "UPSTREAM_ERROR"
+            elif res_json.get("response") is None:
+                # not an answer: must not be journaled as done or kept in the result store
+                raw, status = "ERROR: no response in upstream reply", "UPSTREAM_ERROR"
+            else:
+                raw = str(res_json["response"]).strip()
+        else:
+            raw = f"HTTP_ERROR_{status}"
+    except httpx.TimeoutException:
+        raw, elapsed, status = "TIMEOUT_ERROR", REQUEST_TIMEOUT, "TIMEOUT"
+    except Exception as e:
+        raw, elapsed, status = f"ERROR: {e}", time.perf_counter() - start, "ERROR"
+    return make_row(task, prompt_version, record, model, raw, elapsed, status)
+
+
+def make_row(task, prompt_version, record, model, raw, elapsed, status):
+    parsed = task.parse(raw)
+    if set(parsed) != set(task.columns):
+        raise ValueError(f"task '{task.name}': parser returned {sorted(parsed)}, expected {task.columns}")
+    return {
+        **record,
+        "prompt_id": task.prompt_id,
+        "prompt_version": prompt_version,
+        "model": model,
+        **parsed,
+        "raw_response": raw,
+        "api_time": elapsed,
+        "api_status": status,
+    }
+
+
+async def run_async(task, records, journal, prompt_version, concurrency=CONCURRENCY, models=None, store=None,
+                    prompt_hash=None):
+    """Evaluate every (record, model) pair not yet answered in the journal, with at most `concurrency` requests in flight.
+
+    records can be any iterable and is consumed lazily. With a ResultStore (and the prompt text's hash),
+    stored answers are journaled without a call and new successful answers are added to it.
+    Returns counts of new, failed, stored (answered from the store) and skipped rows.
+    """
+    models = models or task.models
+    counts = {"new": 0, "failed": 0, "stored": 0, "skipped": 0}
+
+    # a bounded queue feeding a fixed set of workers, so only a few records are in memory at a time
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                record, model, key = item
+                row = await evaluate(client, task, prompt_version, record, model)
+                journal.append(row)
+                if key is not None and row["api_status"] == 200:
+                    # SQLite write + commit: off the event loop so the other workers keep going
+                    await asyncio.to_thread(
+                        store.put, key, text_hash(record["sentence"]), prompt_hash, model, task.temperature,
+                        f"{task.prompt_id}@{prompt_version}", row["raw_response"], row["api_time"],
+                    )
+                counts["new"] += 1
+                counts["failed"] += row["api_status"] != 200
+                print(f"  [{counts['new']}] {model} {row['api_time']:.3f}s | {row['api_status']} | "
+                      f"{record['sentence'][:40]} -> {row['raw_response'][:60]!r}")
+
+        async def feed():
+            for record in records:
+                for model in models:
+                    if journal.done((record["sentence_id"], task.prompt_id, prompt_version, model)):
+                        counts["skipped"] += 1
+                        continue
+                    key = None
+                    if store is not None:
+                        key = result_key(text_hash(record["sentence"]), prompt_hash, model, task.temperature)
+                        stored = await asyncio.to_thread(store.get, key)
+                        if stored is not None:
+                            # api_time is that of the original call
+                            journal.append(make_row(task, prompt_version, record, model, *stored, 200))
+                            counts["stored"] += 1
+                            continue
+                    await queue.put((record, model, key))
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        tasks = [asyncio.create_task(feed())] + [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # on Ctrl-C or a failing worker, stop everything; whatever finished is already journaled
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return counts
+
+
+def write_csv(journal, output, prompt_id, prompt_version, models):
+    """Stream the journal's rows for this prompt version and these models into the output CSV."""
+    written = 0
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = None
+        for row in journal.rows():
+            if row["prompt_id"] != prompt_id or str(row["prompt_version"]) != prompt_version or row["model"] not in models:
+                continue
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row), extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def shard_output(output, index, count):
+    root, ext = os.path.splitext(output)
+    return f"{root}.shard-{index}-of-{count}{ext}"
+
+
+def run_to_csv(task, records=None, concurrency=CONCURRENCY, models=None, limit=None, output=None,
+               journal_path=None, fresh=False, shard_spec=None, use_store=True):
+    """Run a task over its corpus (or `records`) and write the CSV; returns the number of rows in it.
+
+    The journal defaults to <output>.journal.jsonl; fresh=True discards it and starts over
+    (answers already in the result store are still reused unless use_store=False).
+    shard_spec=(i, N) only evaluates shard i of N (of the first `limit` records, if given),
+    into <output stem>.shard-i-of-N.csv so shards never share a CSV or journal.
+    """
+    models = list(models or task.models)
+    if records is None:
+        records = read_corpus(task.corpus)
+    if limit is not None:
+        records = itertools.islice(records, limit)
+    output = output or task.output
+    if shard_spec is not None:
+        records = shard(records, *shard_spec)
+        output = shard_output(output, *shard_spec)
+    journal_path = journal_path or f"{output}.journal.jsonl"
+    if fresh and os.path.exists(journal_path):
+        os.remove(journal_path)
+    prompt_version, prompt_text = resolve_prompt(task.prompt_id, task.prompt_version)
+
+    shard_label = f", shard {shard_spec[0]}/{shard_spec[1]}" if shard_spec else ""
+    print(f"Running '{task.name}' ({task.prompt_id}@{prompt_version}) with {len(models)} model(s), "
+          f"concurrency {concurrency}{shard_label}")
+    print("=" * 80)
+    start = time.perf_counter()
+    journal = Journal(journal_path)
+    store = ResultStore() if use_store else None
+    try:
+        counts = asyncio.run(run_async(task, records, journal, prompt_version, concurrency, models, store,
+                                       text_hash(prompt_text)))
+    except KeyboardInterrupt:
+        print(f"\n⚠️ Interrupted; finished rows are kept in {journal_path}, rerun the same command to resume")
+        raise
+    finally:
+        journal.close()
+        if store is not None:
+            store.close()
+    wall_time = time.perf_counter() - start
+
+    written = write_csv(journal, output, task.prompt_id, prompt_version, models)
+    print("=" * 80)
+    if counts["skipped"]:
+        print(f"Resumed from {journal_path}: {counts['skipped']} rows already done")
+    if counts["stored"]:
+        print(f"Reused {counts['stored']} stored answers from {store.path}")
+    print(f"✅ {counts['new']} new rows ({counts['failed']} failed) in {wall_time:.1f}s wall time; "
+          f"{written} rows saved to {output}")
+    return written
+
+
+def run_task(task, records=None, concurrency=CONCURRENCY, models=None, limit=None, output=None,
+             journal_path=None, fresh=False, use_store=True):
+    """run_to_csv, then load the CSV as a DataFrame for the analysis scripts."""
+    output = output or task.output
+    if not run_to_csv(task, records, concurrency, models, limit, output, journal_path, fresh, use_store=use_store):
+        return pd.DataFrame()
+    return pd.read_csv(output)
+
+
+def main():
+    from eval_tasks import TASKS
+
+    parser = argparse.ArgumentParser(description="Run an LLM evaluation task over a sentence corpus through llm-proxy")
+    parser.add_argument("task", choices=sorted(TASKS))
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--model", action="append", dest="models", help="override the task's model(s); repeatable")
+    parser.add_argument("--limit", type=int, help="only the first N sentences")
+    parser.add_argument("--corpus", help=".json (sentences.json layout), .jsonl or .csv corpus (default: the task's)")
+    parser.add_argument("--text-field", help="column holding the sentence in .jsonl/.csv corpora")
+    parser.add_argument("--label-field", help="column holding the gold emotion label in .jsonl/.csv corpora")
+    parser.add_argument("--output", help="CSV path (default: the task's)")
+    parser.add_argument("--journal", help="checkpoint JSONL (default: <output>.journal.jsonl)")
+    parser.add_argument("--fresh", action="store_true", help="discard the journal instead of resuming from it")
+    parser.add_argument("--shard", help="only evaluate shard i of N, e.g. 2/4 (merge with merge_results.py)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="always call the API instead of reusing answers from the result store")
+    args = parser.parse_args()
+    try:
+        shard_spec = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    task = TASKS[args.task]
+    records = read_corpus(args.corpus, args.text_field, args.label_field) if args.corpus else None
+    try:
+        run_to_csv(task, records, args.concurrency, args.models, args.limit, args.output, args.journal, args.fresh,
+                   shard_spec, not args.no_store)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
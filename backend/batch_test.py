@@ -1,83 +1,42 @@
 import pandas as pd
-import requests
-import time
+
+from batch_eval import run_task
+from corpus import sentence_id
+from eval_tasks import TASKS
 
 # Load the dataset
 df = pd.read_csv("hf://datasets/Johnson8187/Chinese_Multi-Emotion_Dialogue_Dataset/data.csv")
 df = df[['text', 'emotion']].dropna()
 
-# FastAPI endpoint
-API_URL = "http://127.0.0.1:8010/invoke"
-
 MODELS = {
     "GPT 4.1": "gpt-4.1",
     "GPT 4.1 mini": "gpt-4.1-mini",
     "Gemini 2.5 Flash": "gemini-2.5-flash"
 }
 
-DEV_PROMPT = (
-    "請逐句分析客戶語氣，從以下情緒中選擇一項回覆：「悲傷語調」、「憤怒語調」、「驚奇語調」、「關切語調」、「開心語調」、「平淡語氣」、「疑問語調」、「厭惡語調」、「無法判斷」。請將客戶每次輸入整段話一起判斷出一個情緒，並指輸出那個情緒，例：憤怒語調。"
-)
-
-results = []
-times = {model: [] for model in MODELS}
-
-from dotenv import load_dotenv
-import os
-
-load_dotenv()  # Loads variables from .env into environment
-AUTH_TOKEN = os.getenv("VITE_AUTH_TOKEN")
-
-for row_num, (i, row) in enumerate(df.sample(n=1000).iterrows(), 1):
-    print(f"Processing row {row_num}: {row['text']}\t語氣：{row['emotion']}")  
-    text = row['text']
-    emotion = row['emotion']
-    result_row = {"text": text, "true emotion": emotion}
-    for model_key, model_value in MODELS.items():
-        payload = {
-            "instance_id": "111",
-            "developer_prompt": DEV_PROMPT,
-            "user_prompt": text,
-            "model_name": model_value,
-            "temperature": 0.6
-        }
-        headers = {
-            "Content-Type": "application/json",
-            "X-Function-Name": "batch-test",
-            "X-Platform-ID": "123",
-            "Authorization": f"Bearer {AUTH_TOKEN}",
-        }
-
-        try:
-            start_time = time.time()
-            response = requests.post(API_URL, headers=headers, json=payload)
-            elapsed_time = time.time() - start_time
-            print(f"\t{model_key}: {response.text}, time: {elapsed_time:.3f}s") # request sent
-            times[model_key].append(elapsed_time)  # store time taken for each model
-            if response.status_code == 200:
-                res_json = response.json()
-                if "error" in res_json:
-                    result_row[model_key] = f"ERROR: {res_json['error']}"
-                else:
-                    res = res_json.get("response", "").strip()
-                    result_row[model_key] = res
-            else:
-                result_row[model_key] = f"ERROR {response.status_code}"
-
-        except Exception as e:
-            print(f"Exception when requesting {model_key}: {e}")
-            result_row[model_key] = str(e)
-
-        time.sleep(1)
-    results.append(result_row)
+# tone-category prompt v1 (llm-proxy/prompts/tone-category/1.txt), every model queried concurrently
+records = [
+    {"sentence_id": sentence_id(row['text']), "sentence": row['text'], "true_emotion": row['emotion']}
+    for _, row in df.sample(n=1000).iterrows()
+]
+long_df = run_task(TASKS["tone-models"], records, models=list(MODELS.values()))
+
+# one column per model, as before (results come back in completion order, so join on sentence_id)
+df_result = pd.DataFrame(records)
+times = {}
+for model_key, model_value in MODELS.items():
+    model_rows = long_df[(long_df["model"] == model_value) & long_df["sentence_id"].isin(df_result["sentence_id"])]
+    model_rows = model_rows.drop_duplicates("sentence_id", keep="last").set_index("sentence_id")
+    df_result[model_key] = df_result["sentence_id"].map(model_rows["predicted"])
+    times[model_key] = model_rows.loc[model_rows["api_status"].astype(str) == "200", "api_time"].tolist()  # store time taken for each model
+df_result = df_result.rename(columns={"sentence": "text", "true_emotion": "true emotion"}).drop(columns="sentence_id")
 
-df_result = pd.DataFrame(results)   # convert results to pandas df
 df_result.to_csv("sandbox_llm_results.csv", index=False)    # saves df to csv file
 
 for model_key in MODELS:
     acc = (df_result[model_key] == df_result["true emotion"]).mean()
-    is_error = df_result[model_key].astype(str).str.startswith("ERROR")
+    is_error = df_result[model_key].astype(str).str.contains("ERROR")
     error_rate = is_error.mean()
     avg_time = sum(times[model_key]) / len(times[model_key]) if times[model_key] else 0
     print(f"{model_key} accuracy: {acc:.2%}, error rate: {error_rate:.2%}")
-    print(f"\taverage time: {avg_time:.3f}s, 95th percentile: {pd.Series(times[model_key]).quantile(0.95):.3f}s, 90th percentile: {pd.Series(times[model_key]).quantile(0.90):.3f}s, min time: {min(times[model_key]):.3f}s, max time: {max(times[model_key]):.3f}s")
\ No newline at end of file
+    print(f"\taverage time: {avg_time:.3f}s, 95th percentile: {pd.Series(times[model_key]).quantile(0.95):.3f}s, 90th percentile: {pd.Series(times[model_key]).quantile(0.90):.3f}s, min time: {min(times[model_key]):.3f}s, max time: {max(times[model_key]):.3f}s")
@@ -1,44 +1,40 @@
-import json, requests, time
+import requests, time
 import pandas as pd
 
-# 讀取 sentences.json
-with open("sentences.json", "r") as f:
-    data = json.load(f)
+from corpus import read_corpus
 
-API_URL = "http://127.0.0.1:8000/predict"  # calling Chinese Emotion API
+API_URL = "http://127.0.0.1:8000/predict_batch"  # calling Chinese Emotion API
+CHUNK_SIZE = 256  # sentences per request
+
+rows = list(read_corpus("sentences.json"))
 
 results = []
 time_list = []
-for character in data:
-    character_info = character["character_information"]
-    for emo in character["sentences"]:
-        label = emo["emotion_label"]
-        for sent in emo["emotion_sentences"]:
-            payload = {"text": sent}
-            headers = {
-                "Content-Type": "application/json",
-            }
-
-            try:
-                start = time.time()
-                response = requests.post(API_URL, headers=headers, json=payload)
-                elapsed = time.time() - start
-                res_json = response.json() if response.status_code == 200 else {}
-                pred = res_json.get("label", "ERROR")
-                print(f"Tested: {sent} | True: {label} | Pred: {pred} | Time: {elapsed:.2f}s")
-                time_list.append(elapsed)
-            except Exception as e:
-                pred = str(e)
-                print(f"ERROR for: {sent} | {e}")
-                time_list.append(0)
-
-            results.append({
-                "character": character_info,
-                "true_emotion": label,
-                "sentence": sent,
-                "predicted": pred
-            })
-            time.sleep(1)
+headers = {
+    "Content-Type": "application/json",
+}
+for start_idx in range(0, len(rows), CHUNK_SIZE):
+    chunk = rows[start_idx:start_idx + CHUNK_SIZE]
+    payload = {"texts": [row["sentence"] for row in chunk]}
+
+    try:
+        start = time.time()
+        response = requests.post(API_URL, headers=headers, json=payload)
+        elapsed = time.time() - start
+        res_json = response.json() if response.status_code == 200 else {}
+        preds = [r.get("label", "ERROR") for r in res_json.get("results", [])]
+        if len(preds) != len(chunk):
+            preds = [f"ERROR {response.status_code}"] * len(chunk)
+        per_sentence = elapsed / len(chunk)  # amortized time per sentence
+    except Exception as e:
+        preds = [f"ERROR: {e}"] * len(chunk)
+        print(f"ERROR for chunk starting at {start_idx} | {e}")
+        per_sentence = 0
+
+    for row, pred in zip(chunk, preds):
+        print(f"Tested: {row['sentence']} | True: {row['true_emotion']} | Pred: {pred} | Time: {per_sentence:.2f}s")
+        time_list.append(per_sentence)
+        results.append({**row, "predicted": pred})
 
 df = pd.DataFrame(results)
 df.to_csv("chinese_emotion_results.csv")
@@ -1,13 +1,12 @@
-import pandas as pd
+from merge_results import join_on_sentence
 
-# read CSV files
-raw_df = pd.read_csv("4.1_tension_results.csv", usecols=["true_emotion", "sentence", "predicted_emotion", "tension_score"])
-df2 = pd.read_csv("4.1_0to1_results.csv", usecols=["predicted_emotion", "predicted_score"])
-df3 = pd.read_csv("4.1_3lev_results.csv", usecols=["predicted_emotion", "intensity_level"])
+# join the three runs on sentence_id (not by row position, so shuffled/sharded/partial runs still line up)
+df = join_on_sentence([
+    ("4.1_tension_results.csv", {"predicted_emotion": "pred1", "tension_score": "tension"}),
+    ("4.1_0to1_results.csv", {"predicted_emotion": "pred2", "predicted_score": "score"}),
+    ("4.1_3lev_results.csv", {"predicted_emotion": "pred3", "intensity_level": "intensity"}),
+])
 
-df = pd.concat([raw_df, df2, df3], axis=1)
-
-df.columns = ["true_emotion", "sentence", "pred1", "tension", "pred2", "score", "pred3", "intensity"]
 df = df[["sentence", "true_emotion", "pred1", "tension", "pred2", "score", "pred3", "intensity"]]
 
 print("Combined dataframe shape:", df.shape)
@@ -15,4 +14,4 @@ print("\nColumn names:", df.columns.tolist())
 print("\nFirst 5 rows:")
 print(df.head())
 
-df.to_excel("gpt_1call.xlsx", index=False)
\ No newline at end of file
+df.to_excel("gpt_1call.xlsx", index=False)
@@ -0,0 +1,134 @@
+"""Streaming corpus readers for the batch evaluations.
+
+read_corpus(path) lazily yields flat records
+
+    {"sentence_id", "character", "true_emotion", "sentence"}
+
+(true_emotion being the gold emotion label) from
+
+- sentences.json-style files (character -> sentences -> emotion_sentences),
+  parsed incrementally with ijson when it is installed, which relies on
+  character_information / emotion_label coming before their sentences as
+  they do in sentences.json;
+- JSONL, one record per line;
+- CSV with a header row, e.g. the HF Chinese_Multi-Emotion_Dialogue_Dataset
+  (text, emotion).
+
+so a corpus never has to fit in memory. shard() splits a corpus
+deterministically by a hash of the sentence text, so every process or
+machine running shard i/N picks the same sentences regardless of file
+order or format.
+"""
+import csv
+import hashlib
+import json
+import sys
+
+try:
+    import ijson
+except ImportError:  # optional; without it sentences.json-style files are loaded whole
+    ijson = None
+
+TEXT_FIELDS = ("sentence", "text")
+LABEL_FIELDS = ("true_emotion", "emotion_label", "emotion", "label")
+CHARACTER_FIELDS = ("character", "character_information")
+
+
+def sentence_id(sentence):
+    """Stable id of a sentence: the same text gets the same id in every corpus file, run and machine."""
+    return hashlib.sha1(sentence.encode("utf-8")).hexdigest()[:16]
+
+
+def make_record(sentence, true_emotion=None, character=None, record_id=None):
+    return {
+        "sentence_id": record_id or sentence_id(sentence),
+        "character": character or "",
+        "true_emotion": true_emotion,
+        "sentence": sentence,
+    }
+
+
+def _first(row, fields):
+    for field in fields:
+        if row.get(field) not in (None, ""):
+            return row[field]
+    return None
+
+
+def _flat_records(rows, text_field=None, label_field=None):
+    """Records from flat rows (JSONL objects, CSV rows); rows without text are skipped."""
+    for row in rows:
+        sentence = row.get(text_field) if text_field else _first(row, TEXT_FIELDS)
+        if not sentence:
+            continue
+        true_emotion = row.get(label_field) if label_field else _first(row, LABEL_FIELDS)
+        yield make_record(sentence, true_emotion, _first(row, CHARACTER_FIELDS), row.get("sentence_id"))
+
+
+def read_nested_json(path):
+    if ijson is None:
+        print(f"⚠️ ijson not installed, loading {path} into memory (pip install ijson)", file=sys.stderr)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for character in data:
+            for emo in character["sentences"]:
+                for sent in emo["emotion_sentences"]:
+                    yield make_record(sent, emo["emotion_label"], character["character_information"])
+        return
+
+    character = label = None
+    with open(path, "rb") as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == "item" and event == "start_map":
+                character = None
+            elif prefix == "item.character_information":
+                character = value
+            elif prefix == "item.sentences.item.emotion_label":
+                label = value
+            elif prefix == "item.sentences.item.emotion_sentences.item":
+                yield make_record(value, label, character)
+
+
+def read_jsonl(path, text_field=None, label_field=None):
+    with open(path, "r", encoding="utf-8") as f:
+        yield from _flat_records((json.loads(line) for line in f if line.strip()), text_field, label_field)
+
+
+def read_csv(path, text_field=None, label_field=None):
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        yield from _flat_records(csv.DictReader(f), text_field, label_field)
+
+
+def shard_of(sentence, count):
+    """0-based shard of a sentence among `count` shards."""
+    return int(hashlib.sha1(sentence.encode("utf-8")).hexdigest()[:15], 16) % count
+
+
+def shard(records, index, count):
+    """Records of shard `index` (1-based) out of `count`."""
+    return (record for record in records if shard_of(record["sentence"], count) == index - 1)
+
+
+def parse_shard(value):
+    """Parse "i/N" into (i, N), with 1 <= i <= N."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {value!r}") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def read_corpus(path, text_field=None, label_field=None):
+    """Records of a .json (sentences.json layout), .jsonl/.ndjson or .csv corpus, one at a time.
+
+    text_field/label_field pick the columns of flat formats; by default the
+    first present of TEXT_FIELDS / LABEL_FIELDS is used.
+    """
+    lower = path.lower()
+    if lower.endswith((".jsonl", ".ndjson")):
+        return read_jsonl(path, text_field, label_field)
+    if lower.endswith(".csv"):
+        return read_csv(path, text_field, label_field)
+    return read_nested_json(path)
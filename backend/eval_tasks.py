@@ -0,0 +1,157 @@
+"""Evaluation tasks for batch_eval.py: prompt id, answer parser and output columns per experiment.
+
+Prompt texts live in llm-proxy/prompts/<prompt_id>/. Adding an experiment
+means adding a parser and a Task here, not another copy of the request loop.
+"""
+import re
+
+from batch_eval import Task
+
+EMOTIONS = ['憤怒', '期待', '厭惡', '恐懼', '喜悅', '悲傷', '驚奇', '信任']
+
+
+def _parse_emotion(response):
+    """情緒：<label>, falling back to the first known emotion mentioned anywhere."""
+    # stop at whitespace so "情緒：悲傷 程度：0.8" on one line doesn't give "悲傷 程度"
+    emotion_match = re.search(r'情緒[：:]\s*([^：:\s]+)', response)
+    if emotion_match:
+        label = emotion_match.group(1)
+        # and a known label glued to the next field ("悲傷程度") is still that label
+        return next((emotion for emotion in EMOTIONS if label.startswith(emotion)), label)
+    for emotion in EMOTIONS:
+        if emotion in response:
+            return emotion
+    return "PARSE_ERROR"
+
+
+def parse_score(response):
+    """情緒：<情緒標籤> 程度：<分數> (0to1BatchTest)."""
+    if "ERROR" in response:
+        return {"predicted_emotion": response, "predicted_score": None}
+
+    match = re.search(r'情緒：([^程度\s]+)\s*程度：([0-9.]+)', response)
+    if not match:
+        return {"predicted_emotion": "PARSE_ERROR", "predicted_score": None}
+    try:
+        score = float(match.group(2))
+    except ValueError:
+        score = None
+    return {"predicted_emotion": match.group(1).strip(), "predicted_score": score}
+
+
+def normalize_intensity(intensity):
+    if intensity.lower() in ['low', '低', '低強度']:
+        return "Low"
+    if intensity.lower() in ['medium', '中', '中強度']:
+        return "Medium"
+    if intensity.lower() in ['high', '高', '高強度']:
+        return "High"
+    return intensity
+
+
+def _parse_intensity_level(response, guess=True):
+    """強度：<level>; with guess=True falls back to any level word mentioned anywhere."""
+    intensity_match = re.search(r'強度[：:]\s*([^：:\s]+)', response)
+    if intensity_match:
+        return normalize_intensity(intensity_match.group(1))
+    if guess:
+        if "Low" in response or "低" in response:
+            return "Low"
+        if "Medium" in response or "中" in response:
+            return "Medium"
+        if "High" in response or "高" in response:
+            return "High"
+    return "PARSE_ERROR"
+
+
+def parse_intensity(response):
+    """情緒：<label> / 強度：<Low/Medium/High> (3levBatchTest)."""
+    if "ERROR" in response:
+        return {"predicted_emotion": "ERROR", "intensity_level": "ERROR"}
+    return {"predicted_emotion": _parse_emotion(response), "intensity_level": _parse_intensity_level(response)}
+
+
+TENSION_PATTERNS = {
+    "tension_modifier": (r'Modifier[：:]\s*(\d+)', int),
+    "tension_idiom": (r'Idiom[：:]\s*(\d+)', int),
+    "tension_degree_head": (r'DegreeHead[：:]\s*(\d+)', int),
+    "tension_word_count": (r'WordCount[：:]\s*(\d+)', int),
+    "tension_score": (r'Tension[：:]\s*([\d.]+)', float),
+}
+
+
+def parse_tension_components(response):
+    result = {}
+    for column, (pattern, cast) in TENSION_PATTERNS.items():
+        match = re.search(pattern, response)
+        try:
+            result[column] = cast(match.group(1)) if match else "PARSE_ERROR"
+        except ValueError:
+            result[column] = "PARSE_ERROR"
+    return result
+
+
+def parse_tension(response):
+    """情緒 plus Modifier/Idiom/DegreeHead/WordCount/Tension (TensionBatchTest)."""
+    if "ERROR" in response:
+        return {"predicted_emotion": "PARSE_ERROR", **{column: "ERROR" for column in TENSION_PATTERNS}}
+    return {"predicted_emotion": _parse_emotion(response), **parse_tension_components(response)}
+
+
+ALL_COLUMNS = ["predicted_emotion", "predicted_score", "intensity_level", *TENSION_PATTERNS]
+
+
+def parse_all(response):
+    """情緒 / 程度 / 強度 / tension components from the single combined call."""
+    if "ERROR" in response:
+        return {column: "ERROR" for column in ALL_COLUMNS}
+
+    score_match = re.search(r'程度[：:]\s*([0-9.]+)', response)
+    try:
+        score = float(score_match.group(1)) if score_match else "PARSE_ERROR"
+    except ValueError:
+        score = "PARSE_ERROR"
+    return {
+        "predicted_emotion": _parse_emotion(response),
+        "predicted_score": score,
+        # the other lines mention 中/高 etc., so only trust an explicit 強度 line here
+        "intensity_level": _parse_intensity_level(response, guess=False),
+        **parse_tension_components(response),
+    }
+
+
+def parse_tone(response):
+    """The answer is the tone label itself (batch_test / batch_test_flash)."""
+    return {"predicted": response}
+
+
+TASKS = {
+    "score": Task(
+        "score", "emotion-score", parse_score, ["predicted_emotion", "predicted_score"],
+        output="4.1_0to1_results.csv", function_name="batch-test2",
+    ),
+    "intensity": Task(
+        "intensity", "emotion-intensity", parse_intensity, ["predicted_emotion", "intensity_level"],
+        output="4.1_3lev_results.csv", function_name="emotion-intensity-analyze",
+    ),
+    "tension": Task(
+        "tension", "emotion-tension", parse_tension, ["predicted_emotion", *TENSION_PATTERNS],
+        output="4.1_tension_results.csv", function_name="emotion-tension-analyze",
+        instance_id="222", platform_id="222",
+    ),
+    # everything above in one call per sentence; compare with agreement.py
+    "all": Task(
+        "all", "emotion-all", parse_all, ALL_COLUMNS,
+        output="4.1_1call_results.csv", function_name="emotion-all-analyze",
+    ),
+    "tone-flash": Task(
+        "tone-flash", "tone-category", parse_tone, ["predicted"],
+        output="gemini_2.5_flash_results.csv", models=("gemini-2.5-flash",), prompt_version="2",
+        function_name="batch-test2",
+    ),
+    "tone-models": Task(
+        "tone-models", "tone-category", parse_tone, ["predicted"],
+        output="sandbox_llm_results_long.csv", models=("gpt-4.1", "gpt-4.1-mini", "gemini-2.5-flash"),
+        prompt_version="1", platform_id="123",
+    ),
+}
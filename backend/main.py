@@ -1,14 +1,52 @@
-# Use a pipeline as a high-level helper
-from transformers import pipeline
-
-pipe = pipeline("text-classification", model="Johnson8187/Chinese-Emotion")
+import asyncio
+import copy
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 
+import metrics
+import onnx_engine
+from prediction_cache import PredictionCache, SqlitePredictionCache
+
 # 添加設備設定
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-# 已在前面設定 device 變數，這裡無需重複定義
+if torch.cuda.is_available():
+    device = torch.device("cuda")
+elif torch.backends.mps.is_available():
+    device = torch.device("mps")
+else:
+    device = torch.device("cpu")
+
+DEFAULT_MODEL_PATH = "Johnson8187/Chinese-Emotion"
+
+# inference engine: "torch" (default) or "onnx" (ONNX Runtime on CPU, see onnx_engine.py)
+INFERENCE_ENGINE = os.getenv("EMOTION_ENGINE", "torch")
+ONNX_QUANTIZE = os.getenv("EMOTION_ONNX_QUANTIZE", "1") == "1"
+
+# micro-batching settings for /predict
+BATCH_WINDOW_MS = float(os.getenv("EMOTION_BATCH_WINDOW_MS", "10"))
+BATCH_MAX_SIZE = int(os.getenv("EMOTION_BATCH_MAX_SIZE", "32"))
+# inference thread pool: forward passes run here, off the event loop
+INFERENCE_WORKERS = int(os.getenv("EMOTION_INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_LIMIT = int(os.getenv("EMOTION_INFERENCE_QUEUE_LIMIT", "256"))  # beyond this -> 503
+# intra-op threads per process (0 keeps torch's default); serve.py sets this per worker
+TORCH_THREADS = int(os.getenv("EMOTION_TORCH_THREADS", "0"))
+# chunk size for /predict_batch (texts per forward pass)
+BUCKET_CHUNK_SIZE = int(os.getenv("EMOTION_BUCKET_CHUNK_SIZE", "64"))
+# lines per forward pass for /predict_stream
+STREAM_BATCH_SIZE = int(os.getenv("EMOTION_STREAM_BATCH_SIZE", "64"))
+
+# prediction cache settings (size 0 disables, TTL 0 means no expiry)
+CACHE_SIZE = int(os.getenv("EMOTION_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("EMOTION_CACHE_TTL", "0"))
+CACHE_SQLITE_PATH = os.getenv("EMOTION_CACHE_SQLITE", "")  # share hits across workers
+
 # 標籤映射字典
 label_mapping = {
     0: ("平淡語氣", 0.0),
@@ -21,33 +59,318 @@ label_mapping = {
     7: ("厭惡語調", -0.7)
 }
 
-def predict_emotion(text, model_path="Johnson8187/Chinese-Emotion"):
-    # 載入模型和分詞器
-    tokenizer = AutoTokenizer.from_pretrained(model_path)
-    model = AutoModelForSequenceClassification.from_pretrained(model_path).to(device)  # 移動模型到設備
-    
+
+class ModelRegistry:
+    """Keeps one resident (tokenizer, model) pair per model_path.
+
+    With engine="onnx" the model is an onnxruntime InferenceSession instead
+    of a torch module.
+    """
+
+    def __init__(self, device, engine="torch"):
+        self.device = device
+        self.engine = engine
+        self.load_seconds = {}
+        self._models = {}
+        self._local = threading.local()
+
+    def load(self, model_path):
+        """Load model_path once; later calls return the resident copy."""
+        if model_path not in self._models:
+            start = time.perf_counter()
+            tokenizer = AutoTokenizer.from_pretrained(model_path)
+            if self.engine == "onnx":
+                model = onnx_engine.load_session(model_path, quantize=ONNX_QUANTIZE)
+            else:
+                model = AutoModelForSequenceClassification.from_pretrained(model_path).to(self.device)  # 移動模型到設備
+                model.eval()
+            self._models[model_path] = (tokenizer, model)
+            self.load_seconds[model_path] = time.perf_counter() - start
+        return self._models[model_path]
+
+    def get(self, model_path):
+        return self.load(model_path)
+
+    def tokenizer(self, model_path):
+        """This thread's own copy of model_path's tokenizer.
+
+        A fast tokenizer keeps its padding/truncation settings as mutable Rust
+        state, so inference threads sharing one fail with "Already borrowed".
+        """
+        copies = self._local.__dict__.setdefault("tokenizers", {})
+        if model_path not in copies:
+            copies[model_path] = copy.deepcopy(self.get(model_path)[0])
+        return copies[model_path]
+
+    def clear(self):
+        self._models.clear()
+        self._local = threading.local()
+
+
+registry = ModelRegistry(device, INFERENCE_ENGINE)
+
+
+def open_prediction_cache():
+    if CACHE_SQLITE_PATH:
+        return SqlitePredictionCache(CACHE_SQLITE_PATH, CACHE_SIZE, CACHE_TTL)
+    return PredictionCache(CACHE_SIZE, CACHE_TTL)
+
+
+# opened in lifespan, i.e. inside each worker: a SQLite connection must not be carried across serve.py's fork()
+prediction_cache = None
+
+
+STAGE_SECONDS = metrics.REGISTRY.histogram(
+    "emotion_stage_seconds", "Time spent per inference stage", ("stage", "model", "batch_size"))
+
+
+def compute_logits(text, model_path=DEFAULT_MODEL_PATH):
+    """Run text (a string or list of strings) through the configured engine."""
+    # 取得常駐的模型和分詞器
+    _, model = registry.get(model_path)
+    tokenizer = registry.tokenizer(model_path)
+    labels = {"model": model_path, "batch_size": metrics.size_bucket(1 if isinstance(text, str) else len(text))}
+
+    if registry.engine == "onnx":
+        with STAGE_SECONDS.time(stage="tokenize", **labels):
+            inputs = tokenizer(text, return_tensors="np", truncation=True, padding=True)
+        with STAGE_SECONDS.time(stage="forward", **labels):
+            return torch.from_numpy(onnx_engine.run(model, inputs))
+
     # 將文本轉換為模型輸入格式
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True).to(device)  # 移動輸入到設備
-    
+    with STAGE_SECONDS.time(stage="tokenize", **labels):
+        inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True)
+    with STAGE_SECONDS.time(stage="device_transfer", **labels):
+        inputs = inputs.to(device)  # 移動輸入到設備
+
     # 進行預測
-    with torch.no_grad():
-        outputs = model(**inputs)
-    
-    # 取得預測結果
-    predicted_class = torch.argmax(outputs.logits).item() # index
-    predicted_emotion, predicted_score = label_mapping[predicted_class] # label & score
+    with STAGE_SECONDS.time(stage="forward", **labels):
+        with torch.no_grad():
+            logits = model(**inputs).logits
+        if device.type == "cuda":
+            torch.cuda.synchronize()  # otherwise we'd only time the kernel launch
+    return logits
+
+
+def predict_emotions(texts, model_path=DEFAULT_MODEL_PATH):
+    """Score a list of texts with one padded forward pass."""
+    logits = compute_logits(texts, model_path)
+    predicted_classes = torch.argmax(logits, dim=-1).tolist()
+    return [label_mapping[c] for c in predicted_classes]
+
+
+def predict_emotions_bucketed(texts, model_path=DEFAULT_MODEL_PATH, chunk_size=BUCKET_CHUNK_SIZE):
+    """Score many texts in length-sorted chunks, returning results in input order.
+
+    Sorting by token length first means each chunk is padded only to its own
+    longest sentence rather than the longest one in the whole request.
+    """
+    tokenizer = registry.tokenizer(model_path)
+    lengths = [len(ids) for ids in tokenizer(texts, truncation=True)["input_ids"]]
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+
+    results = [None] * len(texts)
+    for start in range(0, len(order), chunk_size):
+        chunk = order[start:start + chunk_size]
+        for i, result in zip(chunk, predict_emotions([texts[i] for i in chunk], model_path)):
+            results[i] = result
+    return results
+
+
+def predict_emotions_cached(texts, model_path=DEFAULT_MODEL_PATH):
+    """Like predict_emotions_bucketed, but only cache misses reach the model."""
+    results = [prediction_cache.get(model_path, text) for text in texts]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        predicted = predict_emotions_bucketed([texts[i] for i in missing], model_path)
+        for i, result in zip(missing, predicted):
+            prediction_cache.put(model_path, texts[i], result)
+            results[i] = result
+    return results
+
+
+class InferenceOverloaded(Exception):
+    """Raised when the inference backlog is over its limit; served as HTTP 503."""
+
+
+class InferencePool:
+    """Bounded thread pool for blocking inference so the event loop stays responsive.
+
+    At most `workers` jobs run at once and at most `queue_limit` more may wait;
+    anything beyond that is rejected immediately with InferenceOverloaded.
+    """
+
+    def __init__(self, workers=INFERENCE_WORKERS, queue_limit=INFERENCE_QUEUE_LIMIT):
+        self.workers = max(1, workers)
+        self.queue_limit = queue_limit
+        self.pending = 0  # only touched from the event loop thread
+        self._executor = None
 
-    return predicted_emotion, predicted_score
+    def start(self):
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="inference")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args):
+        if self.pending >= self.workers + self.queue_limit:
+            raise InferenceOverloaded(f"{self.pending} inference jobs pending")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-text requests into one forward pass.
+
+    Requests arriving within `window_ms` of the first queued one (or until
+    `max_batch_size` is reached) are scored together on the inference pool
+    and each caller gets its own (label, score) back. While every pool worker
+    is busy, new requests keep queueing so the next batch comes out larger.
+    """
+
+    def __init__(self, predict_fn, pool, window_ms=BATCH_WINDOW_MS, max_batch_size=BATCH_MAX_SIZE,
+                 max_queue=INFERENCE_QUEUE_LIMIT):
+        self.predict_fn = predict_fn
+        self.pool = pool
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_queue = max_queue
+        self._queue = None
+        self._slots = None
+        self._worker = None
+        self._dispatches = set()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.pool.workers)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = list(self._dispatches)
+        if self._worker is not None:
+            tasks.append(self._worker)
+            self._worker = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, text):
+        if self._queue.qsize() >= self.max_queue:
+            raise InferenceOverloaded(f"{self._queue.qsize()} requests waiting for a batch")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            batch = await self._collect()
+            # drop callers that already went away
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            results = await self.pool.run(self.predict_fn, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+
+def process_memory_mb():
+    """RSS and PSS of this process in MB.
+
+    PSS splits shared pages between the processes mapping them, so summing it
+    over workers gives the real host footprint when weights are shared.
+    """
+    memory = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Private_Dirty"):
+                    memory[key.lower() + "_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        # no /proc (macOS): fall back to peak RSS, which is reported in bytes there
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["max_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return memory
+
+
+# per-process serving info; serve.py resets started_at right after fork
+worker_info = {"started_at": time.perf_counter(), "torch_threads": TORCH_THREADS}
+
+inference_pool = InferencePool()
+batcher = MicroBatcher(predict_emotions, inference_pool)
 
 
 # turn this into an API
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel  # parse JSON into Python objects
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.requests import ClientDisconnect
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # load weights once at startup instead of on every request
+    # (a no-op under serve.py, where the parent already loaded them before forking)
+    if worker_info["torch_threads"]:
+        torch.set_num_threads(worker_info["torch_threads"])
+    registry.load(DEFAULT_MODEL_PATH)
+    global prediction_cache
+    prediction_cache = open_prediction_cache()
+    inference_pool.start()
+    batcher.start()
+    worker_info["cold_start_seconds"] = time.perf_counter() - worker_info["started_at"]
+    print(f"🚀 worker {os.getpid()} ready in {worker_info['cold_start_seconds']:.2f}s "
+          f"(threads={torch.get_num_threads()}, memory={process_memory_mb()})")
+    yield
+    await batcher.stop()
+    inference_pool.shutdown()
+    prediction_cache.close()
+    registry.clear()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow requests from Quasar dev server (localhost:9000)
 app.add_middleware(
@@ -58,20 +381,153 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-if torch.cuda.is_available():
-    device = torch.device("cuda")
-elif torch.backends.mps.is_available():
-    device = torch.device("mps")
-else:
-    device = torch.device("cpu")
+@app.exception_handler(InferenceOverloaded)
+async def overloaded_handler(request: Request, exc: InferenceOverloaded):
+    # fail fast instead of letting requests pile up behind the model
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+async def _score_lines(batch):
+    results = await inference_pool.run(predict_emotions_cached, [text for _, text in batch])
+    return "".join(
+        json.dumps({"line": line_no, "label": label, "score": score}, ensure_ascii=False) + "\n"
+        for (line_no, _), (label, score) in zip(batch, results)
+    )
+
+async def stream_predictions(request: Request):
+    """Yield NDJSON results for newline-delimited text while the body is still arriving.
+
+    Only the current batch and one partial line are held in memory, so input
+    size doesn't matter. Blank lines are skipped but still count for "line".
+    """
+    pending = b""
+    batch = []
+    line_no = 0
+    try:
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                text = line.decode("utf-8", errors="replace").strip()
+                if text:
+                    batch.append((line_no, text))
+                line_no += 1
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield await _score_lines(batch)
+                    batch = []
+        text = pending.decode("utf-8", errors="replace").strip()
+        if text:
+            batch.append((line_no, text))
+        if batch:
+            yield await _score_lines(batch)
+    except InferenceOverloaded as e:
+        # headers are already sent, so report it in-band and stop
+        yield json.dumps({"error": str(e), "line": line_no}) + "\n"
+
+async def cache_call(fn, *args):
+    """Run a prediction_cache method; SQLite reads/writes (and the lock inference threads hold) stay off the event loop."""
+    if isinstance(prediction_cache, SqlitePredictionCache):
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+class BodyStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator is still reading the request body.
+
+    Before ASGI spec 2.4 Starlette listens for http.disconnect alongside the
+    stream, and that listener's receive() swallows the remaining body
+    messages. Here only the iterator calls receive(); request.stream() raises
+    ClientDisconnect if the client goes away.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
 
 class TextInput(BaseModel):
     text: str  # define the structure of the input data
 
 @app.post("/predict") # API endpoint (URL path), POST request
 async def get_prediction(input: TextInput): # function of API
-    label, score = predict_emotion(input.text)
-    return {"label": label, "score": score}
+    result = await cache_call(prediction_cache.get, DEFAULT_MODEL_PATH, input.text)
+    if result is None:
+        result = await batcher.submit(input.text)
+        await cache_call(prediction_cache.put, DEFAULT_MODEL_PATH, input.text, result)
+    label, score = result
+    with STAGE_SECONDS.time(stage="serialize", model=DEFAULT_MODEL_PATH, batch_size="1"):
+        return JSONResponse({"label": label, "score": score})
+
+class BatchTextInput(BaseModel):
+    texts: list[str]
+
+@app.post("/predict_batch")
+async def get_batch_prediction(input: BatchTextInput):
+    if not input.texts:
+        return {"results": []}
+    results = await inference_pool.run(predict_emotions_cached, input.texts)
+    with STAGE_SECONDS.time(stage="serialize", model=DEFAULT_MODEL_PATH, batch_size=metrics.size_bucket(len(results))):
+        return JSONResponse({"results": [{"label": label, "score": score} for label, score in results]})
+
+@app.post("/predict_stream")
+async def get_stream_prediction(request: Request):
+    return BodyStreamingResponse(stream_predictions(request), media_type="application/x-ndjson")
+
+@app.get("/worker_info")
+async def get_worker_info():
+    return {
+        "pid": os.getpid(),
+        "torch_threads": torch.get_num_threads(),
+        "cold_start_seconds": worker_info.get("cold_start_seconds"),
+        "model_load_seconds": registry.load_seconds,
+        "memory": process_memory_mb(),
+    }
+
+@app.get("/cache_stats")
+async def get_cache_stats():
+    return await cache_call(prediction_cache.stats)
+
+@app.get("/metrics")
+async def get_metrics():
+    if prediction_cache is not None:
+        # with SQLite, stats() is a COUNT(*): fetch it off the event loop, then copy the numbers in
+        set_cache_metrics(await cache_call(prediction_cache.stats))
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# request counts / in-flight / latency for every route above
+REQUESTS = metrics.REGISTRY.counter("emotion_requests_total", "HTTP requests served", ("endpoint", "status"))
+IN_FLIGHT = metrics.REGISTRY.gauge("emotion_requests_in_flight", "HTTP requests currently being served", ("endpoint",))
+REQUEST_SECONDS = metrics.REGISTRY.histogram("emotion_request_seconds", "End-to-end HTTP request latency", ("endpoint",))
+app.add_middleware(
+    metrics.RequestMetricsMiddleware,
+    requests=REQUESTS,
+    in_flight=IN_FLIGHT,
+    latency=REQUEST_SECONDS,
+    endpoints=[route.path for route in app.routes],
+)
+
+# values owned by other objects, copied in at scrape time
+CACHE_LOOKUPS = metrics.REGISTRY.counter("emotion_cache_lookups_total", "Prediction cache lookups", ("result",))
+CACHE_SIZE_GAUGE = metrics.REGISTRY.gauge("emotion_cache_entries", "Entries in the prediction cache")
+CACHE_HIT_RATIO = metrics.REGISTRY.gauge("emotion_cache_hit_ratio", "Prediction cache hit rate since startup")
+MODEL_LOAD_SECONDS = metrics.REGISTRY.gauge("emotion_model_load_seconds", "Time taken to load each model", ("model",))
+INFERENCE_PENDING = metrics.REGISTRY.gauge("emotion_inference_pending", "Jobs running or waiting on the inference pool")
+BATCH_QUEUE_DEPTH = metrics.REGISTRY.gauge("emotion_batch_queue_depth", "/predict requests waiting for a micro-batch")
+
+def set_cache_metrics(stats):
+    CACHE_LOOKUPS.set(stats["hits"], result="hit")
+    CACHE_LOOKUPS.set(stats["misses"], result="miss")
+    CACHE_SIZE_GAUGE.set(stats["size"])
+    CACHE_HIT_RATIO.set(stats["hit_rate"])
+
+@metrics.REGISTRY.add_collector
+def collect_runtime_metrics():
+    # cache numbers are set by get_metrics (they may need a SQLite query)
+    for model_path, seconds in registry.load_seconds.items():
+        MODEL_LOAD_SECONDS.set(seconds, model=model_path)
+    INFERENCE_PENDING.set(inference_pool.pending)
+    BATCH_QUEUE_DEPTH.set(batcher.queue_depth())
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
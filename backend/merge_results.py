@@ -0,0 +1,117 @@
+"""Merge batch_eval result CSVs on sentence_id instead of by row position.
+
+Shards of one task (batch_eval.py --shard i/N) are concatenated and
+checked: every (sentence, prompt, model) must be answered exactly once,
+and with --corpus no corpus sentence may be missing. The merged CSV is
+written either way; the exit status is 1 if anything is missing or
+duplicated.
+
+    python merge_results.py 4.1_tension_results.csv 4.1_tension_results.shard-*-of-4.csv --corpus sentences.json
+
+join_on_sentence() lines up the results of different tasks side by side
+(see compare.py).
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from corpus import read_corpus, sentence_id
+
+RESULT_KEY = ("sentence_id", "prompt_id", "prompt_version", "model")
+
+
+def with_sentence_id(df):
+    """Results written before sentence ids existed get them from the sentence text."""
+    if "sentence_id" not in df.columns:
+        df = df.assign(sentence_id=df["sentence"].map(sentence_id))
+    return df
+
+
+def merge_shards(paths, corpus=None):
+    """Concatenate shard CSVs; returns (merged DataFrame, report dict)."""
+    df = pd.concat([with_sentence_id(pd.read_csv(path)) for path in paths], ignore_index=True)
+    key = [column for column in RESULT_KEY if column in df.columns]
+
+    duplicated = df.duplicated(key, keep=False)
+    duplicate_keys = df.loc[duplicated, key].drop_duplicates()
+    if "api_status" in df.columns:
+        # of two answers for the same key, keep a successful one
+        df = df.assign(_ok=df["api_status"].astype(str) == "200").sort_values("_ok", kind="stable")
+        df = df.drop(columns="_ok")
+    merged = df.drop_duplicates(key, keep="last").sort_index()
+
+    expected = {record["sentence_id"] for record in read_corpus(corpus)} if corpus else set(merged["sentence_id"])
+    models = merged["model"].unique() if "model" in merged.columns else [None]
+    missing = []
+    for model in models:
+        answered = set(merged["sentence_id"] if model is None else merged.loc[merged["model"] == model, "sentence_id"])
+        missing += [(sentence, model) for sentence in sorted(expected - answered)]
+
+    report = {
+        "shards": len(paths),
+        "rows": len(merged),
+        "duplicate_rows": int(duplicated.sum()) - len(duplicate_keys),  # rows beyond the first per key
+        "duplicate_examples": duplicate_keys.head(5).values.tolist(),
+        "missing_rows": len(missing),
+        "missing_examples": missing[:5],
+        "failed_rows": int((merged["api_status"].astype(str) != "200").sum()) if "api_status" in merged.columns else 0,
+    }
+    return merged, report
+
+
+def join_on_sentence(sources, keep=("sentence", "true_emotion")):
+    """Join result CSVs of different tasks on sentence_id.
+
+    sources: list of (path, {column: new name}); `keep` columns come from the
+    first file. Duplicate sentences within a file raise ValueError; sentences
+    missing from some files are reported and left empty.
+    """
+    joined = None
+    for path, columns in sources:
+        df = with_sentence_id(pd.read_csv(path))
+        duplicates = df["sentence_id"].duplicated()
+        if duplicates.any():
+            raise ValueError(f"{path}: {duplicates.sum()} duplicate sentences, merge shards first")
+        part = df[["sentence_id", *keep, *columns]].rename(columns=columns)
+        if joined is None:
+            joined = part
+            continue
+        new = ~part["sentence_id"].isin(joined["sentence_id"])
+        missing = (~joined["sentence_id"].isin(part["sentence_id"])).sum()
+        if missing or new.any():
+            print(f"⚠️ {path}: {missing} sentences missing, {new.sum()} not in the earlier files")
+        # left join + append keeps the first file's row order (an outer merge would sort by id)
+        joined = pd.concat([
+            joined.merge(part.drop(columns=list(keep)), on="sentence_id", how="left", validate="one_to_one"),
+            part[new],
+        ], ignore_index=True)
+    return joined
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge batch_eval shard CSVs of one task on sentence id")
+    parser.add_argument("output")
+    parser.add_argument("shards", nargs="+")
+    parser.add_argument("--corpus", help="corpus the shards were cut from, to detect missing sentences")
+    args = parser.parse_args()
+
+    merged, report = merge_shards(args.shards, args.corpus)
+    merged.to_csv(args.output, index=False, encoding="utf-8")
+    print(f"Merged {report['shards']} shards into {args.output}: {report['rows']} rows "
+          f"({report['failed_rows']} failed calls)")
+
+    ok = True
+    if report["duplicate_rows"]:
+        ok = False
+        print(f"❌ {report['duplicate_rows']} duplicate rows, e.g. {report['duplicate_examples']}")
+    if report["missing_rows"]:
+        ok = False
+        print(f"❌ {report['missing_rows']} missing (sentence_id, model) rows, e.g. {report['missing_examples']}")
+    if ok:
+        print("✅ every sentence answered exactly once")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
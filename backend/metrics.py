@@ -0,0 +1,197 @@
+"""Minimal Prometheus text-format metrics for the emotion API.
+
+Counters, gauges and histograms with labels, rendered at GET /metrics. The
+hot path only takes a lock, does a bisect and bumps a few numbers; values
+owned by other objects (cache counters, model load times) are copied in by
+collector callbacks at scrape time instead.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def size_bucket(n):
+    """Power-of-two label for a batch size (1, 2, 4, ... 128+) to keep label cardinality small."""
+    bucket = 1
+    while bucket < n and bucket < 128:
+        bucket *= 2
+    return f"{bucket}+" if n > 128 else str(bucket)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _samples(self):
+        with self._lock:
+            return [(f"{self.name}{self._labels(key)}", value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{sample} {value}" for sample, value in self._samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        """Overwrite the total; for counters collected from another object at scrape time."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]  # per-bucket counts, sum, count
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            snapshot = [(key, list(state[0]), state[1], state[2]) for key, state in sorted(self._values.items())]
+        samples = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                samples.append((f"{self.name}_bucket{self._labels(key, [('le', bound)])}", cumulative))
+            samples.append((f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])}", count))
+            samples.append((f"{self.name}_sum{self._labels(key)}", total))
+            samples.append((f"{self.name}_count{self._labels(key)}", count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, fn):
+        """fn() runs before each render to refresh values owned by other objects."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        for fn in self._collectors:
+            fn()
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware counting requests, in-flight requests and latency per endpoint.
+
+    Paths outside `endpoints` are recorded as "other" so stray URLs can't
+    blow up label cardinality. Latency covers the whole response, including
+    streamed bodies.
+    """
+
+    def __init__(self, app, requests, in_flight, latency, endpoints):
+        self.app = app
+        self.requests = requests
+        self.in_flight = in_flight
+        self.latency = latency
+        self.endpoints = set(endpoints)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = scope["path"] if scope["path"] in self.endpoints else "other"
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight.inc(endpoint=endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight.dec(endpoint=endpoint)
+            self.latency.observe(time.perf_counter() - start, endpoint=endpoint)
+            self.requests.inc(endpoint=endpoint, status=status)
+
+
+REGISTRY = Registry()
@@ -0,0 +1,139 @@
+"""ONNX Runtime inference engine for the Chinese-Emotion classifier.
+
+The PyTorch model is exported to ONNX once and cached on disk (optionally
+dynamic-quantized to int8), then served through an onnxruntime
+InferenceSession on CPU. Run this file directly to build the artifacts and
+check them against the PyTorch logits before switching EMOTION_ENGINE=onnx.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+ONNX_CACHE_DIR = os.getenv("EMOTION_ONNX_CACHE_DIR", "onnx_cache")
+ONNX_OPSET = 14
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Wrap a HF classifier so the exported graph takes positional tensors and returns logits."""
+
+    def __init__(self, model, input_names):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *tensors):
+        return self.model(**dict(zip(self.input_names, tensors))).logits
+
+
+def artifact_path(model_path, quantize=False, cache_dir=ONNX_CACHE_DIR):
+    filename = "model.int8.onnx" if quantize else "model.onnx"
+    return os.path.join(cache_dir, model_path.replace("/", "__"), filename)
+
+
+def export_onnx(model_path, cache_dir=ONNX_CACHE_DIR):
+    """Export model_path to fp32 ONNX unless a cached artifact already exists."""
+    path = artifact_path(model_path, False, cache_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+    sample = tokenizer(["今天天氣很好"], return_tensors="pt")
+    input_names = list(sample.keys())
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    # write to a temp file first so a crash never leaves a half-written artifact in the cache;
+    # per process, so workers building the same artifact at once don't write into one file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.onnx.export(
+        _LogitsOnly(model, input_names),
+        tuple(sample[name] for name in input_names),
+        tmp_path,
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=ONNX_OPSET,
+        # the TorchScript exporter: newer torch defaults to dynamo, which rejects dynamic_axes
+        dynamo=False,
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def quantize_onnx(model_path, cache_dir=ONNX_CACHE_DIR):
+    """Dynamic-quantize the exported model to int8 weights (cached)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    path = artifact_path(model_path, True, cache_dir)
+    if os.path.exists(path):
+        return path
+    source = export_onnx(model_path, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    quantize_dynamic(source, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_session(model_path, quantize=True, cache_dir=ONNX_CACHE_DIR):
+    """Build (or reuse) the ONNX artifact and open a CPU InferenceSession on it."""
+    import onnxruntime as ort
+
+    path = quantize_onnx(model_path, cache_dir) if quantize else export_onnx(model_path, cache_dir)
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def run(session, inputs):
+    """Run tokenizer output (return_tensors="np") through the session and return logits."""
+    feed = {i.name: np.asarray(inputs[i.name], dtype=np.int64) for i in session.get_inputs()}
+    return session.run(["logits"], feed)[0]
+
+
+def check_parity(model_path, texts, quantize=True, cache_dir=ONNX_CACHE_DIR):
+    """Compare ONNX logits with PyTorch logits on CPU for the same texts."""
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+    session = load_session(model_path, quantize, cache_dir)
+
+    with torch.no_grad():
+        torch_logits = model(**tokenizer(texts, return_tensors="pt", truncation=True, padding=True)).logits.numpy()
+    onnx_logits = run(session, tokenizer(texts, return_tensors="np", truncation=True, padding=True))
+
+    return {
+        "texts": len(texts),
+        "max_abs_diff": float(np.abs(torch_logits - onnx_logits).max()),
+        "argmax_agreement": float((torch_logits.argmax(-1) == onnx_logits.argmax(-1)).mean()),
+    }
+
+
+def _sample_sentences(path, limit):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    texts = [sent for character in data for emo in character["sentences"] for sent in emo["emotion_sentences"]]
+    return texts[:limit]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the emotion model to ONNX and check parity with PyTorch")
+    parser.add_argument("--model", default="Johnson8187/Chinese-Emotion")
+    parser.add_argument("--no-quantize", action="store_true", help="check the fp32 export instead of int8")
+    parser.add_argument("--sentences", default="sentences.json")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+
+    report = check_parity(args.model, _sample_sentences(args.sentences, args.limit), quantize=not args.no_quantize)
+    print(json.dumps(report, indent=2))
+    if report["argmax_agreement"] < args.min_agreement:
+        print(f"❌ argmax agreement below {args.min_agreement}, keep EMOTION_ENGINE=torch")
+        sys.exit(1)
+    print("✅ ONNX engine matches PyTorch predictions")
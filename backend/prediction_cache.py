@@ -0,0 +1,147 @@
+"""Prediction cache for the emotion API.
+
+Chat transcripts repeat many short utterances ("好的", "謝謝", "為什麼?"), so
+results are cached by model path plus a hash of the normalized text.
+PredictionCache lives in-process; SqlitePredictionCache keeps the same
+interface on a local SQLite file so several uvicorn workers share hits.
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Fold full-width characters/punctuation (NFKC) and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def cache_key(model_path, text):
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model_path}:{digest}"
+
+
+class PredictionCache:
+    """Size-bounded LRU cache of (label, score) with optional TTL (seconds)."""
+
+    def __init__(self, max_size=10000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, model_path, text):
+        key = cache_key(model_path, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, model_path, text, value):
+        if self.max_size <= 0:
+            return
+        key = cache_key(model_path, text)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), tuple(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        pass
+
+
+class SqlitePredictionCache(PredictionCache):
+    """PredictionCache backed by a SQLite file shared between worker processes.
+
+    Hit/miss counters are per process; entries, LRU order and TTL are shared.
+    Eviction runs every `evict_every` writes rather than on each one, so the
+    table can briefly hold slightly more than max_size rows.
+    """
+
+    evict_every = 100
+
+    def __init__(self, path, max_size=10000, ttl=None):
+        super().__init__(max_size, ttl)
+        self.path = path
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " key TEXT PRIMARY KEY, label TEXT, score REAL, stored_at REAL, used_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS predictions_used_at ON predictions (used_at)")
+
+    def get(self, model_path, text):
+        key = cache_key(model_path, text)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT label, score, stored_at FROM predictions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM predictions WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE predictions SET used_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0], row[1]
+
+    def put(self, model_path, text, value):
+        if self.max_size <= 0:
+            return
+        key = cache_key(model_path, text)
+        label, score = value
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, label, score, stored_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, label, score, now, now),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every:
+                return
+            self._conn.execute(
+                "DELETE FROM predictions WHERE key IN ("
+                " SELECT key FROM predictions ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,34 @@
+"""Read llm-proxy's prompt files (llm-proxy/prompts/<prompt_id>/<version>.txt) from the backend scripts.
+
+The proxy expands prompt_id/prompt_version itself; batch_eval only reads the
+files to pin "latest" to a concrete version for a run and to hash the
+prompt text for the result store. Text is read verbatim, as the proxy does.
+"""
+import os
+
+PROMPT_DIR = os.getenv(
+    "BATCH_EVAL_PROMPT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "llm-proxy", "prompts"),
+)
+
+
+def version_order(version):
+    # must order versions like llm-proxy/prompt_registry.py's version_order, or "latest" differs
+    return (0, int(version), "") if version.isdigit() else (1, 0, version)
+
+
+def prompt_versions(prompt_id, prompt_dir=PROMPT_DIR):
+    folder = os.path.join(prompt_dir, prompt_id)
+    if not os.path.isdir(folder):
+        raise FileNotFoundError(f"unknown prompt_id {prompt_id!r} in {prompt_dir}")
+    return sorted((name[:-len(".txt")] for name in os.listdir(folder) if name.endswith(".txt")), key=version_order)
+
+
+def resolve_prompt(prompt_id, version=None, prompt_dir=PROMPT_DIR):
+    """(version, text) of a registered prompt; the latest version if none is given."""
+    versions = prompt_versions(prompt_id, prompt_dir)
+    version = versions[-1] if version is None and versions else str(version)
+    if version not in versions:
+        raise FileNotFoundError(f"unknown prompt_version {version!r} for prompt_id {prompt_id!r} in {prompt_dir}")
+    with open(os.path.join(prompt_dir, prompt_id, f"{version}.txt"), encoding="utf-8", newline="") as f:
+        return version, f.read()
@@ -0,0 +1,89 @@
+"""Content-addressed store of LLM answers shared by every batch run.
+
+An answer is keyed by the hash of (sentence text, prompt text, model,
+temperature), so it is found again by any task, output file, corpus or
+shard that asks the same question, and editing a prompt (or a new
+version with different text) naturally misses. Only successful raw
+answers are stored; parsing happens per task, so parser fixes apply to
+stored answers too.
+
+The store is a single SQLite file (the key is its primary-key index);
+WAL mode lets several shard processes on one machine share it. Calls are
+blocking and thread-safe; batch_eval runs them with asyncio.to_thread.
+
+    python result_store.py            # what is in the store
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+STORE_PATH = os.getenv(
+    "BATCH_EVAL_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "results_store.sqlite"),
+)
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def result_key(sentence_hash, prompt_hash, model, temperature):
+    return text_hash(f"{sentence_hash}:{prompt_hash}:{model}:{float(temperature)!r}")
+
+
+class ResultStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, sentence_hash TEXT, prompt_hash TEXT, model TEXT, temperature REAL,"
+            " prompt TEXT, raw_response TEXT, api_time REAL, created_at REAL)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        """(raw_response, api_time) stored under key, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT raw_response, api_time FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return row
+
+    def put(self, key, sentence_hash, prompt_hash, model, temperature, prompt, raw_response, api_time):
+        """Store a successful answer; `prompt` ("id@version") is only for reading the store, not part of the key."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, sentence_hash, prompt_hash, model, float(temperature), prompt, raw_response, api_time, time.time()),
+            )
+            self._db.commit()
+
+    def summary(self):
+        """Number of stored answers per (prompt, model, temperature)."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT prompt, model, temperature, COUNT(*) FROM results GROUP BY prompt, model, temperature"
+                " ORDER BY prompt, model, temperature"
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    store = ResultStore()
+    rows = store.summary()
+    print(f"{STORE_PATH}: {sum(row[3] for row in rows)} answers")
+    for prompt, model, temperature, count in rows:
+        print(f"  {prompt:24} {model:20} t={temperature:<4} {count}")
+    store.close()
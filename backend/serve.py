@@ -0,0 +1,114 @@
+"""Serve main.py from several worker processes sharing one copy of the weights.
+
+`uvicorn --workers N` spawns fresh interpreters, so every worker loads its
+own copy of the model. Here the parent loads the model once, binds the
+listening socket and forks the workers, which then share the weight pages
+copy-on-write. Only CPU inference is served this way (CUDA/MPS state
+does not survive fork), and the SQLite prediction cache is opened by
+each worker after the fork. Each worker pins its own torch thread count so N workers do
+not oversubscribe the CPU, and reports its RSS/PSS and cold-start time on
+startup (and at GET /worker_info).
+
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+import torch
+import uvicorn
+
+import main
+import onnx_engine
+
+
+def default_threads(workers):
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock, threads):
+    main.worker_info["started_at"] = time.perf_counter()
+    main.worker_info["torch_threads"] = threads
+    server = uvicorn.Server(uvicorn.Config(main.app, log_level="info"))
+    server.run(sockets=[sock])
+
+
+def serve(workers, host, port, threads):
+    if main.device.type != "cpu":
+        # CUDA/MPS contexts created in the parent are not usable in forked children
+        print(f"⚠️ serve.py forks its workers, using cpu instead of {main.device.type} "
+              f"(run main.py with uvicorn for GPU inference)")
+        main.device = main.registry.device = torch.device("cpu")
+
+    if main.registry.engine == "onnx":
+        # onnxruntime sessions own thread pools that do not survive fork; let each worker open its own,
+        # but build the artifact here once instead of every worker exporting it at the same time
+        if main.ONNX_QUANTIZE:
+            onnx_engine.quantize_onnx(main.DEFAULT_MODEL_PATH)
+        else:
+            onnx_engine.export_onnx(main.DEFAULT_MODEL_PATH)
+        print("ℹ️ EMOTION_ENGINE=onnx: sessions are loaded per worker, not shared")
+    else:
+        start = time.perf_counter()
+        main.registry.load(main.DEFAULT_MODEL_PATH)
+        print(f"📦 model loaded in parent in {time.perf_counter() - start:.2f}s, memory={main.process_memory_mb()}")
+
+    sock = bind_socket(host, port)
+    # keep the parent's objects out of future GC passes so the children don't touch (and copy) their pages
+    gc.freeze()
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock, threads)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    print(f"👷 {workers} workers on http://{host}:{port} with {threads} torch threads each: {children}")
+
+    def forward(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, forward)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.remove(pid)
+        if status:
+            print(f"❌ worker {pid} exited with status {status}")
+    sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-worker emotion API with shared model weights")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per worker (default: cpus / workers)")
+    args = parser.parse_args()
+
+    serve(args.workers, args.host, args.port, args.threads or default_threads(args.workers))
@@ -0,0 +1,96 @@
+"""/predict_stream must score every line of the request body, however it arrives.
+
+The model is replaced by a fake scorer, so this only exercises the
+streaming path (body reading, batching, NDJSON output), not inference.
+
+    python -m pytest -q test_predict_stream.py
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+httpx = pytest.importorskip("httpx")
+uvicorn = pytest.importorskip("uvicorn")
+
+import main  # noqa: E402
+
+LINES = [f"第{i}句話，今天天氣很好。" for i in range(300)]
+
+
+def fake_predict(texts, model_path=main.DEFAULT_MODEL_PATH):
+    return [(text, float(len(text))) for text in texts]
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(main, "predict_emotions_cached", fake_predict)
+    monkeypatch.setattr(main, "STREAM_BATCH_SIZE", 16)
+    main.inference_pool.start()
+    yield main.app
+    main.inference_pool.shutdown()
+
+
+@pytest.fixture
+def server(app):
+    """The app under real uvicorn (lifespan off, so no model is loaded); yields its base URL."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(5)
+    sock.close()
+
+
+def check_results(body):
+    results = [json.loads(line) for line in body.splitlines()]
+    assert [result["line"] for result in results] == list(range(len(LINES)))
+    assert [result["label"] for result in results] == LINES
+
+
+def chunks(data, size=100):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def body():
+    return "\n".join(LINES).encode("utf-8")
+
+
+def test_plain_body_uvicorn(server):
+    r = httpx.post(f"{server}/predict_stream", content=body(), timeout=10)
+    assert r.status_code == 200
+    check_results(r.text)
+
+
+def test_chunked_body_uvicorn(server):
+    # a generator body is sent with Transfer-Encoding: chunked, split mid-line
+    r = httpx.post(f"{server}/predict_stream", content=chunks(body()), timeout=10)
+    assert r.status_code == 200
+    check_results(r.text)
+
+
+def test_chunked_body_asgi(app):
+    async def run():
+        async def agen():
+            for chunk in chunks(body()):
+                yield chunk
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.wait_for(client.post("/predict_stream", content=agen()), 10)
+
+    r = asyncio.run(run())
+    assert r.status_code == 200
+    check_results(r.text)
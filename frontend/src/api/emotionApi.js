@@ -2,7 +2,6 @@ import axios from 'axios'
 const SANDBOX_URL = "http://127.0.0.1:8010/invoke";
 
 const AUTH_TOKEN = import.meta.env.VITE_AUTH_TOKEN
-import { emotionPrompt, tensionPrompt } from 'src/api/prompts.js'
 
 export async function analyzeEmotionAndTension(userDialogue) {
   try {
@@ -10,7 +9,7 @@ export async function analyzeEmotionAndTension(userDialogue) {
     const emotionResponse = await axios.post(SANDBOX_URL,
       {
         instance_id: "111",
-        developer_prompt: emotionPrompt,
+        prompt_id: "emotion", // expanded by llm-proxy (llm-proxy/prompts/emotion/)
         user_prompt: userDialogue,
         model_name: "gemini-2.5-flash",
         temperature: 0.6,
@@ -30,7 +29,7 @@ export async function analyzeEmotionAndTension(userDialogue) {
     const tensionResponse = await axios.post(SANDBOX_URL,
       {
         instance_id: "111",
-        developer_prompt: tensionPrompt,
+        prompt_id: "tension",
         user_prompt: userDialogue,
         model_name: "gemini-2.5-flash",
         temperature: 0.3, // lower temp
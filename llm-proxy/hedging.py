@@ -0,0 +1,76 @@
+"""Hedged requests for the long tail of upstream LLM latency.
+
+The primary call starts immediately. Backup candidates (a faster model, the
+local Chinese-Emotion service) start once the primary has been running past
+a percentile of its recent latencies, or as soon as any candidate fails.
+The first usable answer wins and the rest are cancelled.
+"""
+import asyncio
+from collections import Counter, deque
+
+
+class Hedger:
+    def __init__(self, window=200):
+        self.window = window
+        self.requests = 0
+        self.hedged = 0  # requests where at least one backup was started
+        self.wins = Counter()
+        self._latencies = {}
+
+    def record(self, model_name, seconds):
+        """Remember a successful upstream latency for model_name."""
+        if model_name not in self._latencies:
+            self._latencies[model_name] = deque(maxlen=self.window)
+        self._latencies[model_name].append(seconds)
+
+    def deadline(self, model_name, percentile, default, min_samples=20):
+        """Seconds to wait on model_name before hedging: its p-th percentile latency, or `default` until there is enough history."""
+        samples = sorted(self._latencies.get(model_name, ()))
+        if len(samples) < min_samples:
+            return default
+        return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+    async def first_usable(self, candidates, is_usable):
+        """Race candidates and return (name, result) of the first usable one.
+
+        candidates: list of (name, delay_seconds, factory) where factory() returns
+        a coroutine. If nothing usable arrives, the first plain result in
+        candidate order is returned, or the first exception is raised.
+        """
+        self.requests += 1
+        trigger = asyncio.Event()  # set when a candidate fails, so backups start early
+        started = []
+
+        async def delayed(name, delay, factory):
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(trigger.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            started.append(name)
+            return await factory()
+
+        tasks = {asyncio.create_task(delayed(name, delay, factory)): name for name, delay, factory in candidates}
+        order = list(tasks)
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and is_usable(task.result()):
+                        self.wins[tasks[task]] += 1
+                        return tasks[task], task.result()
+                trigger.set()
+        finally:
+            for task in pending:
+                task.cancel()
+            if len(started) > 1:
+                self.hedged += 1
+
+        for task in order:
+            if task.exception() is None:
+                return tasks[task], task.result()
+        raise order[0].exception()
+
+    def stats(self):
+        return {"requests": self.requests, "hedged": self.hedged, "wins": dict(self.wins)}
@@ -1,8 +1,220 @@
+import asyncio
+from contextlib import asynccontextmanager
+import hashlib
+import json
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import httpx
+from starlette.background import BackgroundTask
+
+from hedging import Hedger
+from prompt_registry import PromptRegistry
+from rate_limit import LimiterRegistry, backoff_delay, is_retryable, retry_after_seconds
+from response_cache import CACHE_MODES, ResponseCache, cache_key
+from singleflight import SingleFlight
+from structured_logging import RequestContextMiddleware, log_event, setup_logging
+from token_manager import TokenManager
+
+load_dotenv()
+
+UPSTREAM_URL = os.getenv("LLM_UPSTREAM_URL", "https://dev-nlp.telligentbiz.com/llm/sandbox/invoke")
+
+# shared upstream client settings
+HTTP2 = os.getenv("LLM_PROXY_HTTP2", "1") == "1"
+MAX_CONNECTIONS = int(os.getenv("LLM_PROXY_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_PROXY_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_PROXY_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.getenv("LLM_PROXY_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LLM_PROXY_READ_TIMEOUT", "60"))
+
+# opt-in response cache: set LLM_PROXY_CACHE_PATH to enable, override per request with X-Cache-Mode
+CACHE_PATH = os.getenv("LLM_PROXY_CACHE_PATH", "")
+CACHE_MAX_BYTES = int(os.getenv("LLM_PROXY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_DEFAULT_MODE = os.getenv("LLM_PROXY_CACHE_DEFAULT_MODE", "use")
+
+# per-model adaptive pacing (see rate_limit.py) and retries on 429/5xx/timeouts
+LIMITER_DEFAULTS = {
+    "concurrency": int(os.getenv("LLM_PROXY_CONCURRENCY", "4")),
+    "rate": float(os.getenv("LLM_PROXY_RATE", "2")),
+    "max_concurrency": int(os.getenv("LLM_PROXY_MAX_CONCURRENCY", "32")),
+    "max_rate": float(os.getenv("LLM_PROXY_MAX_RATE", "50")),
+    "latency_target": float(os.getenv("LLM_PROXY_LATENCY_TARGET", "10")),
+}
+# e.g. {"gpt-4.1": {"concurrency": 8, "rate": 5}}
+LIMITER_OVERRIDES = json.loads(os.getenv("LLM_PROXY_MODEL_LIMITS", "{}"))
+RETRY_ATTEMPTS = int(os.getenv("LLM_PROXY_RETRIES", "3"))
+
+# logging: JSON lines written from a background thread; prompts are left out unless LLM_PROXY_LOG_PROMPTS=1
+LOG_LEVEL = os.getenv("LLM_PROXY_LOG_LEVEL", "INFO")
+LOG_SAMPLE_RATE = float(os.getenv("LLM_PROXY_LOG_SAMPLE_RATE", "1"))  # fraction of requests whose INFO lines are kept
+LOG_PROMPTS = os.getenv("LLM_PROXY_LOG_PROMPTS", "0") == "1"
+
+# managed OAuth client-credentials token; enabled when LLM_PROXY_CLIENT_SECRET is set,
+# in which case it replaces whatever Authorization header clients send
+TOKEN_URL = os.getenv("LLM_PROXY_TOKEN_URL", "https://dev.telligentbiz.com/oauth2api/connect/token")
+CLIENT_ID = os.getenv("LLM_PROXY_CLIENT_ID", "client-credential")
+CLIENT_SECRET = os.getenv("LLM_PROXY_CLIENT_SECRET", "")
+TOKEN_SCOPE = os.getenv("LLM_PROXY_TOKEN_SCOPE", "internal")
+TOKEN_REFRESH_MARGIN = float(os.getenv("LLM_PROXY_TOKEN_REFRESH_MARGIN", "60"))
+
+# hedging: turn on per request with "X-Hedge: on" (or for every request with LLM_PROXY_HEDGE=1)
+HEDGE_DEFAULT = os.getenv("LLM_PROXY_HEDGE", "0") == "1"
+HEDGE_MODEL = os.getenv("LLM_PROXY_HEDGE_MODEL", "gemini-2.5-flash")
+HEDGE_PERCENTILE = float(os.getenv("LLM_PROXY_HEDGE_PERCENTILE", "0.95"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_PROXY_HEDGE_DEFAULT_DELAY", "5"))  # until there is latency history
+# optional last resort: the local Chinese-Emotion service in backend/main.py, e.g. http://127.0.0.1:8000/predict
+LOCAL_FALLBACK_URL = os.getenv("LLM_PROXY_LOCAL_FALLBACK_URL", "")
+# it only answers with a tone label, so it only races prompts whose answer is one (by prompt_id)
+LOCAL_FALLBACK_PROMPTS = {
+    prompt_id.strip() for prompt_id in os.getenv("LLM_PROXY_LOCAL_FALLBACK_PROMPTS", "tone-category").split(",")
+    if prompt_id.strip()
+}
+
+# prompt registry: clients may send prompt_id (+ prompt_version) instead of developer_prompt
+PROMPT_DIR = os.getenv("LLM_PROXY_PROMPT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts"))
+PROMPT_RELOAD_SECONDS = float(os.getenv("LLM_PROXY_PROMPT_RELOAD_SECONDS", "5"))  # 0 = only via POST /prompts/reload
+
+
+def build_client():
+    """One keep-alive client for the whole app, so calls reuse TCP+TLS connections."""
+    http2 = HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401  (httpx needs it for HTTP/2)
+        except ImportError:
+            log_event(logging.WARNING, "h2 not installed, falling back to HTTP/1.1 (pip install 'httpx[http2]')")
+            http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
+
+
+async def watch_prompts(registry, interval):
+    """Pick up edited prompt files without a restart."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(registry.reload_if_changed)
+        except Exception as e:
+            log_event(logging.ERROR, "prompt reload failed", error=repr(e))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    log_listener = setup_logging(LOG_LEVEL)
+    app.state.client = build_client()
+    app.state.cache = ResponseCache(CACHE_PATH, CACHE_MAX_BYTES) if CACHE_PATH else None
+    app.state.singleflight = SingleFlight()
+    app.state.limiters = LimiterRegistry(LIMITER_DEFAULTS, LIMITER_OVERRIDES)
+    app.state.hedger = Hedger()
+    app.state.prompts = PromptRegistry(PROMPT_DIR)
+    app.state.prompts.load()
+    prompt_task = asyncio.create_task(watch_prompts(app.state.prompts, PROMPT_RELOAD_SECONDS)) if PROMPT_RELOAD_SECONDS > 0 else None
+    app.state.tokens = None
+    token_task = None
+    if CLIENT_SECRET:
+        app.state.tokens = TokenManager(
+            app.state.client, TOKEN_URL, CLIENT_ID, CLIENT_SECRET, TOKEN_SCOPE, TOKEN_REFRESH_MARGIN
+        )
+        token_task = asyncio.create_task(app.state.tokens.run())
+    yield
+    background = [task for task in (token_task, prompt_task) if task is not None]
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await app.state.client.aclose()
+    if app.state.cache is not None:
+        app.state.cache.close()
+    log_listener.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+def flight_key(payload, headers):
+    """Identical payload sent with the same credentials -> same upstream call."""
+    canonical = json.dumps([payload, headers.get("Authorization")], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def with_token(app, headers):
+    """headers carrying the managed access token (if any), plus that token."""
+    if app.state.tokens is None:
+        return headers, None
+    token = await app.state.tokens.get()
+    return {**headers, "Authorization": f"Bearer {token}"}, token
+
 
-app = FastAPI()
+def token_rejected(app, r, token):
+    """On a 401 with a managed token, drop it so the retry fetches a fresh one."""
+    if r.status_code != 401 or token is None:
+        return False
+    app.state.tokens.invalidate(token)
+    log_event(logging.WARNING, "upstream rejected the access token, refreshing")
+    return True
+
+
+def upstream_outcome(status_code):
+    """Limiter outcome of an upstream status: only 2xx count as successes, so fast 4xx
+    failures neither raise the limits nor pull the hedge delay down."""
+    if is_retryable(status_code):
+        return "throttled"
+    return "ok" if 200 <= status_code < 300 else None
+
+
+async def call_upstream(app, payload, headers):
+    """POST to the sandbox at the model's current safe rate, retrying 429/5xx/timeouts with jittered backoff."""
+    model_name = payload.get("model_name")
+    limiter = app.state.limiters.get(model_name)
+    for attempt in range(RETRY_ATTEMPTS + 1):
+        last_attempt = attempt == RETRY_ATTEMPTS
+        attempt_headers, token = await with_token(app, headers)
+        await limiter.acquire()
+        outcome = None
+        start = time.perf_counter()
+        try:
+            r = await app.state.client.post(
+                UPSTREAM_URL,
+                json=payload,
+                headers=attempt_headers
+            )
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            outcome = "throttled"
+            if last_attempt:
+                raise
+            delay = backoff_delay(attempt)
+            log_event(logging.WARNING, "upstream error, retrying", model=model_name, error=repr(e),
+                      attempt=attempt + 1, retry_in=round(delay, 3))
+        else:
+            if not last_attempt and token_rejected(app, r, token):
+                continue
+            outcome = upstream_outcome(r.status_code)
+            if outcome == "ok":
+                app.state.hedger.record(model_name, time.perf_counter() - start)
+            if outcome != "throttled" or last_attempt:
+                log_event(logging.INFO, "upstream response", model=model_name, status=r.status_code,
+                          upstream_latency=round(time.perf_counter() - start, 3), response_bytes=len(r.content))
+                return r.status_code, r.json()
+            delay = max(backoff_delay(attempt), retry_after_seconds(r))
+            log_event(logging.WARNING, "upstream throttled, retrying", model=model_name, status=r.status_code,
+                      attempt=attempt + 1, retry_in=round(delay, 3))
+        finally:
+            await limiter.release(outcome, time.perf_counter() - start)
+        await asyncio.sleep(delay)
+
+
+app.add_middleware(RequestContextMiddleware, sample_rate=LOG_SAMPLE_RATE)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,15 +224,113 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/invoke")
-async def proxy_invoke(request: Request):
-    
-    print("✋ invoke hit")
+async def open_upstream_stream(app, payload, headers):
+    """Send the request with the body left unread, retrying retryable failures before any byte is relayed.
+
+    Returns (response, limiter, start); the caller must relay and close the response and release the limiter.
+    """
+    model_name = payload.get("model_name")
+    limiter = app.state.limiters.get(model_name)
+    client = app.state.client
+    for attempt in range(RETRY_ATTEMPTS + 1):
+        last_attempt = attempt == RETRY_ATTEMPTS
+        attempt_headers, token = await with_token(app, headers)
+        await limiter.acquire()
+        start = time.perf_counter()
+        try:
+            request = client.build_request("POST", UPSTREAM_URL, json=payload, headers=attempt_headers)
+            r = await client.send(request, stream=True)
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            await limiter.release("throttled", time.perf_counter() - start)
+            if last_attempt:
+                raise
+            delay = backoff_delay(attempt)
+            log_event(logging.WARNING, "upstream error, retrying", model=model_name, error=repr(e),
+                      attempt=attempt + 1, retry_in=round(delay, 3))
+        except BaseException:
+            await limiter.release()
+            raise
+        else:
+            if not last_attempt and token_rejected(app, r, token):
+                await r.aclose()
+                await limiter.release()
+                continue
+            if not is_retryable(r.status_code) or last_attempt:
+                return r, limiter, start
+            await r.aclose()
+            await limiter.release("throttled", time.perf_counter() - start)
+            delay = max(backoff_delay(attempt), retry_after_seconds(r))
+            log_event(logging.WARNING, "upstream throttled, retrying", model=model_name, status=r.status_code,
+                      attempt=attempt + 1, retry_in=round(delay, 3))
+        await asyncio.sleep(delay)
+
+
+class StreamRelay:
+    """An open upstream stream plus its limiter slot, relayed chunk by chunk and freed exactly once.
+
+    chunks() frees them when it finishes or is closed; close() is also run as the
+    response's background task, for when Starlette never starts iterating
+    (client gone, sending the headers failed).
+    """
+
+    def __init__(self, r, limiter, start, model_name):
+        self.r = r
+        self.limiter = limiter
+        self.start = start
+        self.model_name = model_name
+        self.first_byte = None
+        self.outcome = None
+        self.closed = False
+
+    async def chunks(self):
+        """Yield upstream chunks as they arrive, logging time-to-first-byte separately from total time."""
+        try:
+            async for chunk in self.r.aiter_bytes():
+                if self.first_byte is None:
+                    self.first_byte = time.perf_counter() - self.start
+                    log_event(logging.INFO, "stream first byte", model=self.model_name, ttfb=round(self.first_byte, 3))
+                yield chunk
+            self.outcome = upstream_outcome(self.r.status_code)
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.r.aclose()
+        finally:
+            total = time.perf_counter() - self.start
+            log_event(logging.INFO, "stream done", model=self.model_name, status=self.r.status_code,
+                      ttfb=round(self.first_byte or total, 3), upstream_latency=round(total, 3))
+            await self.limiter.release(self.outcome, self.first_byte or total)
+
+
+async def stream_invoke(app, payload, headers):
+    """Pass the upstream response through chunk by chunk (SSE or chunked), bypassing cache and coalescing."""
+    try:
+        r, limiter, start = await open_upstream_stream(app, payload, headers)
+    except Exception as e:
+        log_event(logging.ERROR, "ERROR inside /invoke (stream)", model=payload.get("model_name"), error=str(e))
+        return {"error": str(e)}
+    relay = StreamRelay(r, limiter, start, payload.get("model_name"))
+    return StreamingResponse(
+        relay.chunks(),
+        status_code=r.status_code,
+        media_type=r.headers.get("content-type", "application/octet-stream"),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(relay.close),
+    )
+
 
-    payload = await request.json()
-    print(payload["user_prompt"], payload["model_name"])
+def wants_stream(request, payload):
+    return request.query_params.get("stream", "").lower() in ("1", "true") or bool(payload.get("stream"))
 
-    auth_header = request.headers.get("Authorization")
+
+def upstream_headers(request):
+    # with a managed token the client's own Authorization header is ignored (see with_token)
+    auth_header = None if request.app.state.tokens is not None else request.headers.get("Authorization")
     # print("Received Authorization header from frontend:", auth_header)
     headers = {
         "Content-Type": "application/json",
@@ -30,16 +340,187 @@ async def proxy_invoke(request: Request):
 
     if auth_header:
         headers["Authorization"] = auth_header
+    return headers
+
+
+def resolve_cache_mode(request):
+    """X-Cache-Mode for this request ("bypass" when caching is off), or None if the header is invalid."""
+    cache_mode = request.headers.get("x-cache-mode", CACHE_DEFAULT_MODE).lower()
+    if cache_mode not in CACHE_MODES:
+        return None
+    return cache_mode if request.app.state.cache is not None else "bypass"
+
+
+def invalid_cache_mode():
+    return JSONResponse({"error": f"X-Cache-Mode must be one of {', '.join(CACHE_MODES)}"}, status_code=400)
+
+
+async def invoke(app, payload, headers, cache_mode):
+    """Answer one invoke payload from the cache or upstream; returns (body, X-Cache value)."""
+    cache = app.state.cache
+    key = cache_key(payload)
+
+    if cache_mode in ("use", "read-only"):
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            log_event(logging.INFO, "cache hit", model=payload.get("model_name"), cache_key=key[:12])
+            return cached, "HIT"
+
+    writes = cache_mode in ("use", "refresh")
+
+    async def fetch():
+        status_code, body = await call_upstream(app, payload, headers)
+        # only successful answers are worth replaying; stored once per flight, not once per waiter
+        if writes and status_code == 200 and "error" not in body:
+            await asyncio.to_thread(cache.put, key, body)
+        return status_code, body
+
+    # concurrent identical requests share one upstream call (callers that write the cache share their own)
+    _, body = await app.state.singleflight.do(flight_key(payload, headers) + (":write" if writes else ""), fetch)
+    return body, "BYPASS" if cache_mode == "bypass" else "MISS"
+
 
+async def call_local_model(app, payload):
+    """Ask the local Chinese-Emotion /predict service, reshaped like an upstream invoke response."""
+    r = await app.state.client.post(LOCAL_FALLBACK_URL, json={"text": payload["user_prompt"]})
+    data = r.json()
+    if r.status_code != 200 or "label" not in data:
+        return {"error": f"local model returned HTTP {r.status_code}"}, "LOCAL"
+    return {"response": data["label"], "score": data["score"], "model_name": "local"}, "LOCAL"
+
+
+def wants_hedge(request):
+    value = request.headers.get("x-hedge")
+    return HEDGE_DEFAULT if value is None else value.lower() in ("1", "on", "true")
+
+
+async def hedged_invoke(app, payload, headers, cache_mode, prompt=None):
+    """Race the requested model against HEDGE_MODEL (and the local model) once it runs past its latency percentile.
+
+    prompt is the expanded "id@version"; the local model only joins for LOCAL_FALLBACK_PROMPTS.
+    """
+    model_name = payload.get("model_name")
+    deadline = app.state.hedger.deadline(model_name, HEDGE_PERCENTILE, HEDGE_DEFAULT_DELAY)
+    candidates = [(model_name, 0, lambda: invoke(app, payload, headers, cache_mode))]
+    if HEDGE_MODEL and HEDGE_MODEL != model_name:
+        hedge_payload = {**payload, "model_name": HEDGE_MODEL}
+        candidates.append((HEDGE_MODEL, deadline, lambda: invoke(app, hedge_payload, headers, cache_mode)))
+    if LOCAL_FALLBACK_URL and prompt is not None and prompt.split("@")[0] in LOCAL_FALLBACK_PROMPTS:
+        candidates.append(("local", deadline, lambda: call_local_model(app, payload)))
+
+    winner, (body, cache_status) = await app.state.hedger.first_usable(
+        candidates, lambda result: "error" not in result[0]
+    )
+    if winner != model_name:
+        log_event(logging.INFO, "hedge won", model=model_name, winner=winner, deadline=round(deadline, 3))
+    return winner, body, cache_status
+
+
+def expand_prompt(request, payload):
+    """Swap prompt_id/prompt_version for the registered developer_prompt; returns ("id@version" or None, error response or None)."""
     try:
-        async with httpx.AsyncClient() as client:
-            r = await client.post(
-                "https://dev-nlp.telligentbiz.com/llm/sandbox/invoke",
-                json=payload,
-                headers=headers
-            )
-            print("LLM Response:", r)
-            return r.json()
+        return request.app.state.prompts.expand(payload), None
+    except KeyError as e:
+        return None, JSONResponse({"error": e.args[0]}, status_code=400)
+
+
+def log_request(endpoint, payload, payload_bytes, **fields):
+    if LOG_PROMPTS:
+        fields["user_prompt"] = payload.get("user_prompt")
+    log_event(logging.INFO, f"{endpoint} hit", payload_bytes=payload_bytes, **fields)
+
+
+@app.post("/invoke")
+async def proxy_invoke(request: Request):
+
+    raw = await request.body()
+    payload = json.loads(raw)
+    prompt, error = expand_prompt(request, payload)
+    if error is not None:
+        return error
+    log_request("invoke", payload, len(raw), model=payload["model_name"], prompt=prompt)
+
+    headers = upstream_headers(request)
+    if wants_stream(request, payload):
+        return await stream_invoke(request.app, payload, headers)
+
+    cache_mode = resolve_cache_mode(request)
+    if cache_mode is None:
+        return invalid_cache_mode()
+
+    try:
+        if wants_hedge(request):
+            winner, body, cache_status = await hedged_invoke(request.app, payload, headers, cache_mode, prompt)
+            return JSONResponse(body, headers={"X-Cache": cache_status, "X-Hedge-Winner": winner})
+        body, cache_status = await invoke(request.app, payload, headers, cache_mode)
     except Exception as e:
-        print("❌ ERROR inside /invoke:", str(e))
-        return {"error": str(e)}
\ No newline at end of file
+        log_event(logging.ERROR, "ERROR inside /invoke", model=payload.get("model_name"), error=str(e))
+        return {"error": str(e)}
+    return JSONResponse(body, headers={"X-Cache": cache_status})
+
+@app.post("/invoke_multi")
+async def proxy_invoke_multi(request: Request):
+    """Send one prompt to several models at once, so a row costs the slowest model instead of the sum.
+
+    Body is an /invoke payload with `model_names` (a list) in place of `model_name`.
+    """
+
+    raw = await request.body()
+    payload = json.loads(raw)
+    model_names = payload.pop("model_names", None)
+    if not isinstance(model_names, list) or not model_names:
+        return JSONResponse({"error": "model_names must be a non-empty list"}, status_code=400)
+    prompt, error = expand_prompt(request, payload)
+    if error is not None:
+        return error
+    log_request("invoke_multi", payload, len(raw), models=model_names, prompt=prompt)
+
+    headers = upstream_headers(request)
+    cache_mode = resolve_cache_mode(request)
+    if cache_mode is None:
+        return invalid_cache_mode()
+
+    async def invoke_model(model_name):
+        start = time.perf_counter()
+        try:
+            body, cache_status = await invoke(request.app, {**payload, "model_name": model_name}, headers, cache_mode)
+        except Exception as e:
+            log_event(logging.ERROR, "ERROR inside /invoke_multi", model=model_name, error=str(e))
+            body, cache_status = {"error": str(e)}, "ERROR"
+        return model_name, body, cache_status, time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(invoke_model(name) for name in dict.fromkeys(model_names)))
+    return {
+        "responses": {name: body for name, body, _, _ in results},
+        "timings": {name: elapsed for name, _, _, elapsed in results},
+        "cache": {name: cache_status for name, _, cache_status, _ in results},
+        "total_time": time.perf_counter() - start,
+    }
+
+@app.get("/cache_stats")
+async def cache_stats(request: Request):
+    cache = request.app.state.cache
+    return cache.stats() if cache is not None else {"enabled": False}
+
+@app.get("/prompts")
+async def list_prompts(request: Request):
+    return request.app.state.prompts.list()
+
+@app.post("/prompts/reload")
+async def reload_prompts(request: Request):
+    registry = request.app.state.prompts
+    await asyncio.to_thread(registry.load)
+    return registry.list()
+
+@app.get("/stats")
+async def stats(request: Request):
+    cache = request.app.state.cache
+    return {
+        "cache": cache.stats() if cache is not None else {"enabled": False},
+        "singleflight": request.app.state.singleflight.stats(),
+        "limiters": request.app.state.limiters.stats(),
+        "hedging": request.app.state.hedger.stats(),
+        "prompts": request.app.state.prompts.stats(),
+        "token": request.app.state.tokens.stats() if request.app.state.tokens is not None else {"managed": False},
+    }
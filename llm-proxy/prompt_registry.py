@@ -0,0 +1,97 @@
+"""Versioned developer prompts held by the proxy, so clients send an id instead of the text.
+
+Prompts live on disk as <root>/<prompt_id>/<version>.txt and are used
+verbatim (no stripping). For emotion, tension, emotion-intensity,
+emotion-tension and tone-category that is byte-for-byte what their
+clients used to send, so they keep hitting the same response-cache
+entries; emotion-score is not: 0to1BatchTest.py used to send the whole
+stripped prompt_2.js, JS `export const prompt = ` wrapper included, and
+the file holds just the prompt, so its old cache entries miss. Versions are
+compared numerically where possible; omitting prompt_version means latest.
+The whole set is reloaded atomically when any file changes.
+"""
+import logging
+import os
+
+from structured_logging import log_event
+
+
+def version_order(version):
+    # "10" sorts after "9"; non-numeric versions sort after numeric ones, by name
+    # (backend/prompt_files.py orders them the same way to pin "latest" for batch runs)
+    return (0, int(version), "") if version.isdigit() else (1, 0, version)
+
+
+class PromptRegistry:
+    def __init__(self, root):
+        self.root = root
+        self.reloads = 0
+        self.expansions = 0
+        self._prompts = {}  # prompt_id -> {version: text}
+        self._signature = None
+
+    def _scan(self):
+        """(path, mtime, size) of every prompt file, used to notice edits without reading them."""
+        entries = []
+        if not os.path.isdir(self.root):
+            return tuple(entries)
+        for prompt_id in sorted(os.listdir(self.root)):
+            folder = os.path.join(self.root, prompt_id)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                if name.endswith(".txt"):
+                    path = os.path.join(folder, name)
+                    stat = os.stat(path)
+                    entries.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(entries)
+
+    def load(self):
+        signature = self._scan()
+        prompts = {}
+        for path, _, _ in signature:
+            prompt_id = os.path.basename(os.path.dirname(path))
+            version = os.path.basename(path)[:-len(".txt")]
+            with open(path, encoding="utf-8", newline="") as f:
+                prompts.setdefault(prompt_id, {})[version] = f.read()
+        # swap in one assignment so concurrent lookups see either the old or the new set
+        self._prompts = prompts
+        self._signature = signature
+        self.reloads += 1
+        log_event(logging.INFO, "prompts loaded", prompt_dir=self.root,
+                  prompts={prompt_id: sorted(versions, key=version_order) for prompt_id, versions in prompts.items()})
+
+    def reload_if_changed(self):
+        """Reload when a prompt file was added, removed or edited; returns whether it did."""
+        if self._scan() == self._signature:
+            return False
+        self.load()
+        return True
+
+    def get(self, prompt_id, version=None):
+        """(version, text) for prompt_id at `version`, or its latest version; KeyError if unknown."""
+        versions = self._prompts.get(prompt_id)
+        if not versions:
+            raise KeyError(f"unknown prompt_id {prompt_id!r}")
+        if version is None:
+            version = max(versions, key=version_order)
+        version = str(version)
+        if version not in versions:
+            raise KeyError(f"unknown prompt_version {version!r} for prompt_id {prompt_id!r}")
+        return version, versions[version]
+
+    def expand(self, payload):
+        """Replace prompt_id/prompt_version in payload with developer_prompt; returns "id@version" or None."""
+        prompt_id = payload.pop("prompt_id", None)
+        version = payload.pop("prompt_version", None)
+        if prompt_id is None:
+            return None
+        version, payload["developer_prompt"] = self.get(prompt_id, version)
+        self.expansions += 1
+        return f"{prompt_id}@{version}"
+
+    def list(self):
+        return {prompt_id: sorted(versions, key=version_order) for prompt_id, versions in self._prompts.items()}
+
+    def stats(self):
+        return {"prompts": len(self._prompts), "reloads": self.reloads, "expansions": self.expansions}
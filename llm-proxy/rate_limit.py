@@ -0,0 +1,118 @@
+"""Adaptive per-model pacing for upstream LLM calls.
+
+Each model_name gets a concurrency limit and a token bucket. Both grow
+additively while upstream answers quickly and successfully, and are cut in
+half on 429/5xx/timeouts (AIMD), so the proxy converges on the fastest rate
+the sandbox tolerates instead of every client sleeping a fixed second.
+"""
+import asyncio
+import random
+import time
+
+
+def backoff_delay(attempt, base=0.5, cap=20.0):
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after_seconds(response):
+    try:
+        return float(response.headers.get("Retry-After", 0))
+    except ValueError:  # HTTP-date form; fall back to our own backoff
+        return 0.0
+
+
+def is_retryable(status_code):
+    return status_code == 429 or status_code >= 500
+
+
+class AdaptiveLimiter:
+    def __init__(self, concurrency=4, rate=2.0, min_concurrency=1, max_concurrency=32,
+                 min_rate=0.2, max_rate=50.0, latency_target=10.0, cooldown=1.0):
+        self.limit = float(concurrency)
+        self.rate = float(rate)  # tokens per second
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.latency_target = latency_target
+        self.cooldown = cooldown  # one decrease per window, not one per failed request
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        self._decreased_at = 0.0
+        self._cond = asyncio.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        burst = max(1.0, self.rate)  # allow up to one second's worth of calls at once
+        self._tokens = min(burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        # the token bucket is waited on outside the condition so other slots aren't blocked by it
+        try:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        except BaseException:
+            # cancelled while waiting for a token (hedge loser, abandoned singleflight call):
+            # the caller never got the slot, so it can't release it
+            await asyncio.shield(self._free_slot())
+            raise
+
+    async def _free_slot(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def release(self, outcome=None, latency=0.0):
+        """outcome: "ok", "throttled" (429/5xx/timeout), or None to leave the limits alone."""
+        if outcome == "ok":
+            self.successes += 1
+            if latency > self.latency_target:
+                self._decrease(0.9)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + 1 / max(self.rate, 1))
+        elif outcome == "throttled":
+            self.throttled += 1
+            self._decrease(0.5)
+        await self._free_slot()
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self._decreased_at < self.cooldown:
+            return
+        self._decreased_at = now
+        self.limit = max(self.min_concurrency, self.limit * factor)
+        self.rate = max(self.min_rate, self.rate * factor)
+
+    def stats(self):
+        return {"concurrency_limit": round(self.limit, 2), "rate_per_second": round(self.rate, 2),
+                "in_flight": self.in_flight, "successes": self.successes, "throttled": self.throttled}
+
+
+class LimiterRegistry:
+    """One AdaptiveLimiter per model_name, created on first use; `overrides` maps model -> kwargs."""
+
+    def __init__(self, defaults=None, overrides=None):
+        self.defaults = defaults or {}
+        self.overrides = overrides or {}
+        self._limiters = {}
+
+    def get(self, model_name):
+        if model_name not in self._limiters:
+            self._limiters[model_name] = AdaptiveLimiter(**{**self.defaults, **self.overrides.get(model_name, {})})
+        return self._limiters[model_name]
+
+    def stats(self):
+        return {model_name: limiter.stats() for model_name, limiter in self._limiters.items()}
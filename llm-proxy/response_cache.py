@@ -0,0 +1,94 @@
+"""Disk-backed cache of upstream /invoke responses for deterministic replays.
+
+Entries are keyed on a canonical hash of developer_prompt, user_prompt,
+model_name and temperature, stored in a local SQLite file and evicted
+least-recently-used once the stored bodies exceed max_bytes.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+CACHE_FIELDS = ("developer_prompt", "user_prompt", "model_name", "temperature")
+
+# X-Cache-Mode header values
+#   use       read and write (default)
+#   bypass    neither read nor write
+#   refresh   skip the read, overwrite with the fresh upstream response
+#   read-only read, never write
+CACHE_MODES = ("use", "bypass", "refresh", "read-only")
+
+
+def cache_key(payload):
+    canonical = json.dumps(
+        {field: payload.get(field) for field in CACHE_FIELDS},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, body TEXT, size INTEGER, stored_at REAL, used_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+        self._bytes = self._total_bytes()
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, response):
+        body = json.dumps(response, ensure_ascii=False)
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, stored_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, body, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)  # REPLACE drops the old row's bytes
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # other workers may share the file, so re-read the real total before deleting
+        self._bytes = self._total_bytes()
+        while self._bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY used_at LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bytes -= size
+                if self._bytes <= self.max_bytes:
+                    break
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"entries": entries, "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._conn.close()
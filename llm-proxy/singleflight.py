@@ -0,0 +1,51 @@
+"""Coalesce identical in-flight upstream calls.
+
+Concurrent callers with the same key share one upstream call and all get
+its result (or its exception). One caller going away does not cancel the
+call for the others; it is only cancelled once every caller has left.
+"""
+import asyncio
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = 0  # upstream calls actually made
+        self.saved = 0  # callers that joined an existing call instead
+        self._calls = {}
+
+    def in_flight(self):
+        return len(self._calls)
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key, fn):
+        """Await fn() once per key among concurrent callers."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.calls += 1
+        else:
+            self.saved += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # everyone left: stop the upstream call and let new callers start a fresh one
+                self._forget(key, call)
+                call.task.cancel()
+
+    def stats(self):
+        return {"upstream_calls": self.calls, "saved_calls": self.saved, "in_flight": self.in_flight()}
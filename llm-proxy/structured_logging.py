@@ -0,0 +1,95 @@
+"""JSON logging for llm-proxy that never writes to stdout on the event loop.
+
+Records go through a QueueHandler; a QueueListener thread formats them as
+one JSON object per line and does the actual write. Requests are sampled
+as a whole (every line of a sampled request is kept), while warnings and
+errors always pass. Structured fields are passed as keyword arguments to
+log_event() and end up as top-level JSON keys.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+
+logger = logging.getLogger("llm_proxy")
+
+# request id + sampling decision for the request currently being handled
+request_context = contextvars.ContextVar("request_context", default={"request_id": None, "sampled": True})
+
+
+def log_event(level, message, **fields):
+    logger.log(level, message, extra={"fields": fields})
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the request id and drop INFO/DEBUG lines of unsampled requests."""
+
+    def filter(self, record):
+        context = request_context.get()
+        record.request_id = context["request_id"]
+        return context["sampled"] or record.levelno >= logging.WARNING
+
+
+class RequestContextMiddleware:
+    """ASGI middleware assigning each request an id (X-Request-ID, echoed back) and a sampling decision."""
+
+    def __init__(self, app, sample_rate=1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex[:16]
+        token = request_context.set({"request_id": request_id, "sampled": random.random() < self.sample_rate})
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_context.reset(token)
+
+
+def setup_logging(level="INFO"):
+    """Route llm_proxy logs through a background writer thread; returns the started QueueListener."""
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    logger.handlers = [queue_handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
@@ -0,0 +1,95 @@
+"""Client-credentials access token shared by every upstream call.
+
+Replaces fetching a token by hand with backend/get_token.py and pasting it
+into VITE_AUTH_TOKEN: the proxy obtains the token itself, refreshes it in
+the background before it expires, and collapses concurrent refreshes into a
+single token request.
+"""
+import asyncio
+import logging
+import time
+
+from structured_logging import log_event
+
+
+class TokenManager:
+    def __init__(self, client, token_url, client_id, client_secret, scope="", refresh_margin=60.0):
+        self.client = client
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.refresh_margin = refresh_margin  # refresh this many seconds before expiry
+        self.refreshes = 0
+        self.failures = 0
+        self._token = None
+        self._expires_at = 0.0
+        self._lifetime = 3600.0
+        self._refreshing = None
+
+    def _valid(self):
+        return self._token is not None and time.monotonic() < self._expires_at - 5
+
+    async def get(self):
+        """Current access token, fetching one first if needed."""
+        if self._valid():
+            return self._token
+        return await self.refresh()
+
+    def invalidate(self, token):
+        """Upstream rejected `token`; make the next get() fetch a new one."""
+        if token == self._token:
+            self._expires_at = 0.0
+
+    async def refresh(self):
+        # one token request at a time; everyone else awaits the same one
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._fetch())
+            self._refreshing.add_done_callback(self._refresh_done)
+        return await asyncio.shield(self._refreshing)
+
+    def _refresh_done(self, task):
+        self._refreshing = None
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    async def _fetch(self):
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+        }
+        if self.scope:
+            data["scope"] = self.scope
+        r = await self.client.post(self.token_url, data=data)
+        r.raise_for_status()
+        body = r.json()
+        self._token = body["access_token"]
+        self._lifetime = float(body.get("expires_in", 3600))
+        self._expires_at = time.monotonic() + self._lifetime
+        self.refreshes += 1
+        log_event(logging.INFO, "access token refreshed", expires_in=self._lifetime)
+        return self._token
+
+    async def run(self):
+        """Background loop: keep a fresh token ready so requests never wait on (or die of) expiry."""
+        retry_delay = 1.0
+        while True:
+            try:
+                # short-lived tokens get refreshed at half their lifetime instead
+                margin = min(self.refresh_margin, self._lifetime / 2)
+                if time.monotonic() >= self._expires_at - margin:
+                    await self.refresh()
+                retry_delay = 1.0
+                delay = max(1.0, self._expires_at - margin - time.monotonic())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_event(logging.ERROR, "token refresh failed", error=repr(e), retry_in=retry_delay)
+                delay = retry_delay
+                retry_delay = min(60.0, retry_delay * 2)
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        remaining = self._expires_at - time.monotonic() if self._token else None
+        return {"valid": self._valid(), "expires_in": remaining, "refreshes": self.refreshes, "failures": self.failures}